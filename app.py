@@ -4,14 +4,18 @@ FastAPI server for KellerBot - integrates message generation with GroupMe intera
 """
 
 from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 import asyncio
+import hashlib
 import json
 import os
+from datetime import datetime
 import uvicorn
 from server.bot_controller import BotController
+import metrics
 from env import BOT_GROUP_ID
 
 app = FastAPI(title="KellerBot API", description="Async bot controller for GroupMe integration")
@@ -28,6 +32,29 @@ except Exception as e:
 # Setup templates
 templates = Jinja2Templates(directory="templates")
 
+def not_modified(request: Request, etag: str) -> bool:
+    """Check whether the client's If-None-Match header already matches etag."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return header.strip() == "*" or etag in [tag.strip() for tag in header.split(",")]
+
+def conditional_json(request: Request, payload, etag: str = None) -> Response:
+    """
+    Return payload as JSON with an ETag, or an empty 304 if the client already has it.
+    
+    Without an explicit etag, one is derived from a hash of the payload.
+    """
+    payload = jsonable_encoder(payload)
+    if etag is None:
+        body = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+    # no-cache makes browsers revalidate every time, so fetch() gets the 304 for free
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(payload, headers=headers)
+
 @app.on_event("startup")
 async def startup():
     """Start the bot polling when the app starts."""
@@ -65,7 +92,7 @@ async def startup_bot():
 async def shutdown():
     """Stop the bot polling when the app shuts down."""
     try:
-        await bot_controller.stop_polling()
+        await bot_controller.close()
         print("🛑 Bot polling stopped on app shutdown")
     except Exception as e:
         print(f"⚠️ Failed to stop bot polling on shutdown: {e}")
@@ -84,22 +111,100 @@ async def health_check():
         "timestamp": asyncio.get_event_loop().time()
     }
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus metrics for polling, generation and sending."""
+    content = bot_controller.render_metrics() if bot_controller is not None else metrics.render()
+    return PlainTextResponse(content, media_type="text/plain; version=0.0.4")
+
 @app.get("/api/status")
-async def get_status():
-    """Get bot status."""
+async def get_status(request: Request):
+    """Get bot status. Supports If-None-Match."""
     if bot_controller is None:
         raise HTTPException(status_code=503, detail="Bot controller not available - check configuration")
-    return await bot_controller.get_bot_status()
+    return conditional_json(request, await bot_controller.get_bot_status())
 
 @app.get("/api/messages")
-async def get_messages():
-    """Get pending messages."""
-    return await bot_controller.get_pending_messages()
+async def get_messages(request: Request):
+    """Get pending messages. Supports If-None-Match."""
+    # The version cursor changes whenever any message does, so check it before building the list
+    etag = f'"{bot_controller.get_messages_cursor()}"'
+    if not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    return conditional_json(request, await bot_controller.get_pending_messages(), etag)
+
+@app.get("/api/messages/changes")
+async def get_message_changes(cursor: str = None):
+    """Get messages changed since cursor. Omit cursor for a full snapshot; a response with reset: true is also a full snapshot."""
+    return await bot_controller.get_message_changes(cursor)
+
+@app.get("/api/events")
+async def message_events(request: Request):
+    """Server-Sent Events stream of message changes for the dashboard."""
+    if bot_controller is None:
+        raise HTTPException(status_code=503, detail="Bot controller not available - check configuration")
+    
+    async def event_stream():
+        queue = bot_controller.subscribe_events()
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    # Keep-alive comment so proxies don't close an idle stream
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {event['event']}\ndata: {json.dumps(event.get('message'))}\n\n"
+        finally:
+            bot_controller.unsubscribe_events(queue)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/messages/history")
+async def get_message_history(after: str = None, since: str = None, until: str = None, limit: int = 50):
+    """Page through message history. Pass next_cursor back as after; since/until are ISO datetimes."""
+    try:
+        since_dt = datetime.fromisoformat(since) if since else None
+        until_dt = datetime.fromisoformat(until) if until else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail={"success": False, "error": str(e)})
+    limit = max(1, min(limit, 500))
+    return await bot_controller.get_message_history(after, since_dt, until_dt, limit)
+
+@app.get("/api/archive/search")
+async def search_archive(q: str = None, user_id: str = None, group_id: str = None, since: str = None, until: str = None,
+                         min_likes: int = None, order: str = None, limit: int = 50, offset: int = 0):
+    """Full-text search over archived chat history. since/until are ISO datetimes."""
+    try:
+        since_ts = int(datetime.fromisoformat(since).timestamp()) if since else None
+        until_ts = int(datetime.fromisoformat(until).timestamp()) if until else None
+        results = await bot_controller.search_archive(
+            query=q, user_id=user_id, group_id=group_id, since=since_ts, until=until_ts,
+            min_likes=min_likes, order=order, limit=max(1, min(limit, 200)), offset=max(0, offset)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail={"success": False, "error": str(e)})
+    return {"results": results}
+
+@app.get("/api/archive/stats")
+async def get_archive_stats():
+    """Get archived message totals."""
+    return await bot_controller.get_archive_stats()
+
+@app.get("/api/replies/decisions")
+async def get_reply_decisions():
+    """Get recent reply probability decisions for auditing."""
+    return await bot_controller.get_reply_decisions()
 
 @app.get("/api/config")
-async def get_config():
-    """Get current configuration."""
-    return await bot_controller.get_config()
+async def get_config(request: Request):
+    """Get current configuration. Supports If-None-Match."""
+    return conditional_json(request, await bot_controller.get_config())
 
 @app.post("/api/config")
 async def update_config(request: Request):
@@ -159,6 +264,19 @@ async def generate_test_message():
         raise HTTPException(status_code=400, detail={"success": False, "error": str(e)})
 
 
+@app.post("/api/groupme/callback")
+async def groupme_callback(request: Request):
+    """Receive messages pushed by a GroupMe bot callback URL."""
+    if bot_controller is None:
+        raise HTTPException(status_code=503, detail="Bot controller not available - check configuration")
+    if not bot_controller.verify_callback_token(request.query_params.get('token')):
+        raise HTTPException(status_code=403, detail="Invalid callback token")
+    try:
+        payload = await request.json()
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid callback payload")
+    ingested = await bot_controller.handle_callback(payload)
+    return {"success": True, "ingested": ingested}
 
 @app.post("/api/bot/server")
 async def set_bot_server(request: Request):
@@ -0,0 +1,223 @@
+"""
+Shared plumbing for the offline benchmarks: a BotController wired to the mock servers,
+latency tracking and result summaries.
+
+Import this before any bot module so the dummy credentials are in place when the bot reads
+the environment.
+"""
+
+import os
+
+# Dummy credentials, set before the bot modules read the environment (and .env) on import
+os.environ["GROUPME_ACCESS_TOKEN"] = "benchmark"
+os.environ["OPENAI_API_KEY"] = "benchmark"
+
+import json
+import time
+import asyncio
+from typing import Callable, Dict, List, Optional
+
+from openai import AsyncOpenAI
+from benchmarks.mock_servers import MOCK_GROUP_ID, MockGroupMe, MockOpenAI
+from groupme.rate_limiter import rate_limiter, TokenBucket
+from server.bot_controller import BotController
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile, or None for no values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+def summarize(values: List[float]) -> Dict:
+    """Count, mean and p50/p90/p99/max of latencies, in milliseconds."""
+    if not values:
+        return {'count': 0}
+    return {
+        'count': len(values),
+        'mean_ms': round(sum(values) / len(values) * 1000, 1),
+        'p50_ms': round(percentile(values, 50) * 1000, 1),
+        'p90_ms': round(percentile(values, 90) * 1000, 1),
+        'p99_ms': round(percentile(values, 99) * 1000, 1),
+        'max_ms': round(max(values) * 1000, 1),
+    }
+
+def print_latency(latency: Dict[str, Dict]) -> None:
+    """Print latency summaries as aligned rows."""
+    print("  Latency:")
+    for name, summary in latency.items():
+        if summary['count']:
+            print(f"    {name:28} n={summary['count']:<5} p50 {summary['p50_ms']:>8}ms  p90 {summary['p90_ms']:>8}ms  "
+                  f"p99 {summary['p99_ms']:>8}ms  max {summary['max_ms']:>8}ms")
+        else:
+            print(f"    {name:28} n=0")
+
+def print_requests(requests: Dict[str, Dict[str, int]]) -> None:
+    """Print mock server request counts."""
+    for server, counts in requests.items():
+        print(f"  {server} requests:")
+        for key, count in counts.items():
+            print(f"    {key:40} {count}")
+
+def write_config(directory: str, overrides: Dict) -> str:
+    """
+    Write a bot config for a run: server/config.json plus overrides, with the message store
+    and archive in the scratch directory.
+
+    Returns:
+        str: Path of the written config
+    """
+    with open("server/config.json", "r") as f:
+        config = json.load(f)
+    config.update(overrides)
+    config["message_store_path"] = os.path.join(directory, "messages.db")
+    config["message_archive_path"] = os.path.join(directory, "archive.db")
+    path = os.path.join(directory, "config.json")
+    with open(path, "w") as f:
+        json.dump(config, f, indent=2)
+    return path
+
+def create_controller(groupme: MockGroupMe, openai_mock: MockOpenAI, config_path: str, unthrottled: bool = False) -> BotController:
+    """
+    Create a BotController that talks to the mock servers.
+
+    Args:
+        groupme (MockGroupMe): Started GroupMe mock
+        openai_mock (MockOpenAI): Started OpenAI mock
+        config_path (str): Config written by write_config
+        unthrottled (bool): Lift the client-side GroupMe rate limits to measure the bot rather than the limiter
+    """
+    if unthrottled:
+        rate_limiter.global_bucket = TokenBucket(1e9, 10**9)
+        rate_limiter.endpoint_buckets = {}
+    controller = BotController(MOCK_GROUP_ID, config_path=config_path, callback_token="benchmark")
+    controller.groupme_interface.base_url = f"{groupme.url}/v3"
+    controller.message_manager.message_generator.client = AsyncOpenAI(
+        api_key="benchmark", base_url=f"{openai_mock.url}/v1", max_retries=0
+    )
+    return controller
+
+async def wait_for(condition: Callable[[], bool], timeout: float, interval: float = 0.05) -> bool:
+    """Wait until condition() is true. Returns False on timeout."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() >= deadline:
+            return False
+        await asyncio.sleep(interval)
+    return True
+
+async def drain(controller: BotController, timeout: float) -> bool:
+    """Wait for queued and running generation to finish. Returns False on timeout."""
+    return await wait_for(
+        lambda: controller.generation_scheduler.is_idle()
+        and controller.message_manager.get_generating_messages_count() == 0,
+        timeout
+    )
+
+class LatencyTracker:
+    """
+    Follows a message from injection in the mock GroupMe to its reply candidates.
+
+    Ingestion is timed by wrapping BotController.ingest_message; generation progress comes
+    from the MessageManager event stream.
+    """
+
+    def __init__(self, controller: BotController, groupme: MockGroupMe):
+        self.controller = controller
+        self.groupme = groupme
+        self.ingested_at: Dict[str, float] = {}
+        self.ingest: List[float] = []
+        self.queue_delay: List[float] = []
+        self.generation_start: List[float] = []
+        self.first_candidate: List[float] = []
+        self.all_candidates: List[float] = []
+        self.candidates = 0
+        self.started_ids = set()
+        self.first_candidate_ids = set()
+        self.finished_ids = set()
+        self.queue = controller.message_manager.subscribe(max_queued=100000)
+        self.task: Optional[asyncio.Task] = None
+
+        original_ingest = controller.ingest_message
+
+        async def timed_ingest(message_data: Dict, source: str) -> bool:
+            message_id = message_data.get('id')
+            injected = groupme.injected_at.get(message_id)
+            if injected is not None and message_id not in self.ingested_at:
+                self.ingested_at[message_id] = time.perf_counter()
+                self.ingest.append(self.ingested_at[message_id] - injected)
+            return await original_ingest(message_data, source)
+
+        controller.ingest_message = timed_ingest
+
+    def start(self) -> None:
+        self.task = asyncio.create_task(self._consume())
+
+    async def _consume(self) -> None:
+        while True:
+            event = await self.queue.get()
+            now = time.perf_counter()
+            message = event.get('message') or {}
+            reply_to_id = message.get('reply_to_id')
+            injected = self.groupme.injected_at.get(reply_to_id)
+            if message.get('message_type') != 'reply' or injected is None:
+                continue
+            message_id = message['id']
+            if event['event'] == 'created' and message_id not in self.started_ids:
+                self.started_ids.add(message_id)
+                self.generation_start.append(now - injected)
+                if reply_to_id in self.ingested_at:
+                    self.queue_delay.append(now - self.ingested_at[reply_to_id])
+            elif event['event'] == 'candidate_added' and message_id not in self.first_candidate_ids:
+                self.first_candidate_ids.add(message_id)
+                self.first_candidate.append(now - injected)
+            elif event['event'] == 'finished' and message_id not in self.finished_ids:
+                self.finished_ids.add(message_id)
+                self.all_candidates.append(now - injected)
+                self.candidates += len(message.get('generated_messages', []))
+
+    def get_latency(self) -> Dict[str, Dict]:
+        """Summaries of every tracked latency."""
+        return {
+            'inject_to_ingest': summarize(self.ingest),
+            'ingest_to_generation_start': summarize(self.queue_delay),
+            'inject_to_generation_start': summarize(self.generation_start),
+            'inject_to_first_candidate': summarize(self.first_candidate),
+            'inject_to_all_candidates': summarize(self.all_candidates),
+        }
+
+    async def stop(self) -> None:
+        self.controller.message_manager.unsubscribe(self.queue)
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+
+class QueueSampler:
+    """Samples the generation queue depth periodically, for peak and mean load."""
+
+    def __init__(self, controller: BotController, interval: float = 0.25):
+        self.controller = controller
+        self.interval = interval
+        self.samples: List[int] = []
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self.task = asyncio.create_task(self._sample())
+
+    async def _sample(self) -> None:
+        while True:
+            stats = self.controller.generation_scheduler.get_stats()
+            self.samples.append(stats['queued'] + stats['running'])
+            await asyncio.sleep(self.interval)
+
+    def get_stats(self) -> Dict:
+        """Peak and mean of queued plus running jobs."""
+        if not self.samples:
+            return {'peak': 0, 'mean': 0}
+        return {'peak': max(self.samples), 'mean': round(sum(self.samples) / len(self.samples), 2)}
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
@@ -0,0 +1,299 @@
+"""
+Local stand-ins for the GroupMe v3 API and the OpenAI Responses API, for offline benchmarks.
+
+Both mocks are FastAPI apps served by uvicorn on a free localhost port inside the running
+event loop, with configurable latency, error rate and rate limit. They count every request
+so a benchmark can report how many calls the bot made.
+"""
+
+import re
+import json
+import time
+import random
+import socket
+import asyncio
+from collections import Counter
+from typing import Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+from groupme.rate_limiter import TokenBucket
+
+MOCK_USER_ID = "mock-bot-user"
+MOCK_GROUP_ID = "424242"
+
+class MockServer:
+    """
+    Base class: serves self.app on localhost and applies latency, errors and rate limits.
+    """
+
+    def __init__(self, latency: float = 0.0, latency_jitter: float = 0.0, error_rate: float = 0.0,
+                 rate_limit_per_minute: Optional[float] = None, rate_limit_burst: int = 10):
+        """
+        Initialize the mock.
+
+        Args:
+            latency (float): Seconds added to every response
+            latency_jitter (float): Extra uniformly random seconds, 0 to this value
+            error_rate (float): Fraction of requests answered with a 500
+            rate_limit_per_minute (float): Sustained requests per minute before answering 429, None for unlimited
+            rate_limit_burst (int): Requests allowed back to back before the rate limit applies
+        """
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.bucket = TokenBucket(rate_limit_per_minute, rate_limit_burst) if rate_limit_per_minute else None
+        self.request_counts: Counter = Counter()  # "METHOD route status" -> count
+        self.app = FastAPI()
+        self.server: Optional[uvicorn.Server] = None
+        self.serve_task: Optional[asyncio.Task] = None
+        self.port: Optional[int] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    async def _simulate(self, request: Request, route: str) -> Optional[Response]:
+        """
+        Apply latency, rate limiting and random errors to a request.
+
+        Returns:
+            Response: A 429 or 500 to return instead of the real answer, or None to proceed
+        """
+        delay = self.latency + random.uniform(0, self.latency_jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        status = 200
+        if self.bucket is not None and self.bucket.time_until_available() > 0:
+            status = 429
+        elif self.bucket is not None:
+            self.bucket.take()
+        if status == 200 and random.random() < self.error_rate:
+            status = 500
+        self.request_counts[f"{request.method} {route} {status}"] += 1
+        if status == 429:
+            return JSONResponse({"error": "rate limited"}, status_code=429, headers={"Retry-After": "1"})
+        if status == 500:
+            return JSONResponse({"error": "simulated failure"}, status_code=500)
+        return None
+
+    def _count(self, request: Request, route: str, status: int) -> None:
+        """Correct the recorded status of a request answered with something other than 200."""
+        self.request_counts[f"{request.method} {route} 200"] -= 1
+        self.request_counts[f"{request.method} {route} {status}"] += 1
+
+    def get_request_counts(self) -> Dict[str, int]:
+        """Get request counts by "METHOD route status", skipping zeroes."""
+        return {key: count for key, count in sorted(self.request_counts.items()) if count}
+
+    async def start(self) -> None:
+        """Serve the app on a free localhost port in the current event loop."""
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        config = uvicorn.Config(self.app, host="127.0.0.1", port=self.port, log_level="warning", lifespan="off")
+        self.server = uvicorn.Server(config)
+        self.serve_task = asyncio.create_task(self.server.serve())
+        while not self.server.started:
+            if self.serve_task.done():
+                self.serve_task.result()  # Raise the startup error
+            await asyncio.sleep(0.01)
+
+    async def stop(self) -> None:
+        """Shut the server down."""
+        if self.server is not None:
+            self.server.should_exit = True
+            await self.serve_task
+            self.server = None
+
+class MockGroupMe(MockServer):
+    """
+    GroupMe v3 stand-in with one group whose messages are injected by the benchmark.
+
+    Implements the endpoints AsyncGroupMeInterface uses: users/me, groups, group info, and
+    reading (limit / after_id / before_id paging, 304 when empty) and posting group messages.
+    """
+
+    def __init__(self, members: int = 50, **kwargs):
+        """
+        Initialize the mock.
+
+        Args:
+            members (int): Number of fake members in the group info response
+            **kwargs: Latency, error and rate limit settings, see MockServer
+        """
+        super().__init__(**kwargs)
+        self.members = [{"user_id": str(1000 + i), "nickname": f"Member {i}"} for i in range(members)]
+        self.messages: List[Dict] = []
+        self.next_id = 1
+        self.injected_at: Dict[str, float] = {}  # Message ID -> perf_counter when it was posted
+        self.sent: List[Dict] = []
+        self.add_message("Welcome to the group", user_id="1000", name="Member 0")
+        self._add_routes()
+
+    def add_message(self, text: str, user_id: str = "1001", name: str = "Member 1", likes: int = 0,
+                    created_at: int = None, message_id: str = None) -> Dict:
+        """
+        Post a message to the group as a member.
+
+        Returns:
+            Dict: The raw GroupMe message
+        """
+        if message_id is None:
+            message_id = str(self.next_id)
+        # GroupMe IDs are numeric and increase over time; keep generated ones above any given
+        self.next_id = max(self.next_id, int(message_id)) + 1
+        message = {
+            "id": message_id,
+            "group_id": MOCK_GROUP_ID,
+            "user_id": user_id,
+            "sender_id": user_id,
+            "sender_type": "user",
+            "name": name,
+            "text": text,
+            "created_at": created_at or int(time.time()),
+            "favorited_by": [str(2000 + i) for i in range(likes)],
+            "attachments": [],
+            "system": False,
+        }
+        self.messages.append(message)
+        self.injected_at[message_id] = time.perf_counter()
+        return message
+
+    def _add_routes(self) -> None:
+        app = self.app
+
+        @app.get("/v3/users/me")
+        async def users_me(request: Request):
+            error = await self._simulate(request, "/users/me")
+            return error or {"response": {"id": MOCK_USER_ID, "name": "KellerBot"}}
+
+        @app.get("/v3/groups")
+        async def groups(request: Request):
+            error = await self._simulate(request, "/groups")
+            return error or {"response": [self._group_info()]}
+
+        @app.get("/v3/groups/{group_id}")
+        async def group(group_id: str, request: Request):
+            error = await self._simulate(request, "/groups/:id")
+            return error or {"response": self._group_info()}
+
+        @app.get("/v3/groups/{group_id}/messages")
+        async def get_messages(group_id: str, request: Request, limit: int = 20,
+                               after_id: str = None, before_id: str = None):
+            error = await self._simulate(request, "/groups/:id/messages")
+            if error:
+                return error
+            limit = max(1, min(limit, 100))
+            if after_id is not None:
+                # Oldest first, like GroupMe's after_id paging
+                page = [m for m in self.messages if int(m["id"]) > int(after_id)][:limit]
+            else:
+                older = [m for m in self.messages if before_id is None or int(m["id"]) < int(before_id)]
+                page = list(reversed(older))[:limit]
+            if not page:
+                self._count(request, "/groups/:id/messages", 304)
+                return Response(status_code=304)
+            return {"response": {"count": len(self.messages), "messages": page}}
+
+        @app.post("/v3/groups/{group_id}/messages")
+        async def post_message(group_id: str, request: Request):
+            error = await self._simulate(request, "/groups/:id/messages")
+            if error:
+                return error
+            body = (await request.json()).get("message", {})
+            self.sent.append(body)
+            message = self.add_message(body.get("text", ""), user_id=MOCK_USER_ID, name="KellerBot")
+            self._count(request, "/groups/:id/messages", 201)
+            return JSONResponse({"response": {"message": message}}, status_code=201)
+
+    def _group_info(self) -> Dict:
+        return {
+            "id": MOCK_GROUP_ID,
+            "name": "Benchmark Group",
+            "members": self.members,
+            "messages": {"count": len(self.messages), "last_message_id": self.messages[-1]["id"]},
+        }
+
+class MockOpenAI(MockServer):
+    """
+    OpenAI Responses API stand-in.
+
+    Answers POST /v1/responses with canned text. Structured-output (batched) requests get
+    {"messages": [...]} with as many messages as the prompt asks for. Usage reports the
+    instructions as cached after the first request with a given prompt_cache_key.
+    """
+
+    def __init__(self, output_tokens: int = 40, **kwargs):
+        """
+        Initialize the mock.
+
+        Args:
+            output_tokens (int): Output tokens reported per generated message
+            **kwargs: Latency, error and rate limit settings, see MockServer
+        """
+        super().__init__(**kwargs)
+        self.output_tokens = output_tokens
+        self.cache_keys = set()
+        self.generated = 0
+        self.input_tokens = 0
+        self.output_tokens_total = 0
+        self._add_routes()
+
+    def _add_routes(self) -> None:
+        @self.app.post("/v1/responses")
+        async def create_response(request: Request):
+            error = await self._simulate(request, "/responses")
+            if error:
+                return error
+            body = await request.json()
+            return self._response(body)
+
+    def _response(self, body: Dict) -> Dict:
+        """Build a Responses API payload for a request body."""
+        prompt = body.get("input", "")
+        instructions = body.get("instructions", "") or ""
+        structured = body.get("text", {}).get("format", {}).get("type") == "json_schema"
+        match = re.search(r"Generate (\d+) different messages", prompt)
+        count = int(match.group(1)) if structured and match else 1
+
+        messages = [f"Mock message {self.generated + i + 1}" for i in range(count)]
+        self.generated += count
+        text = json.dumps({"messages": messages}) if structured else messages[0]
+
+        # Roughly 4 characters per token; the static instructions are cached per cache key
+        instruction_tokens = len(instructions) // 4
+        input_tokens = instruction_tokens + len(prompt) // 4
+        cache_key = body.get("prompt_cache_key")
+        cached_tokens = instruction_tokens if cache_key in self.cache_keys else 0
+        if cache_key:
+            self.cache_keys.add(cache_key)
+        output_tokens = self.output_tokens * count
+        self.input_tokens += input_tokens
+        self.output_tokens_total += output_tokens
+
+        return {
+            "id": f"resp_{self.generated}",
+            "object": "response",
+            "created_at": int(time.time()),
+            "model": body.get("model", "gpt-5"),
+            "status": "completed",
+            "parallel_tool_calls": True,
+            "tool_choice": "auto",
+            "tools": [],
+            "output": [{
+                "type": "message",
+                "id": f"msg_{self.generated}",
+                "role": "assistant",
+                "status": "completed",
+                "content": [{"type": "output_text", "text": text, "annotations": []}],
+            }],
+            "usage": {
+                "input_tokens": input_tokens,
+                "input_tokens_details": {"cached_tokens": cached_tokens},
+                "output_tokens": output_tokens,
+                "output_tokens_details": {"reasoning_tokens": 0},
+                "total_tokens": input_tokens + output_tokens,
+            },
+        }
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Replay recorded chat history through KellerBot against the mock GroupMe and OpenAI servers.
+
+Reads a message CSV in the GroupMeScraper format (message_id, timestamp, user_name, user_id,
+text, likes, ...; inspiring_messages.csv is one), or an .arrow/.parquet corpus built from such
+files by groupme.message_corpus, and feeds it, oldest first, into the bot at
+real time, an accelerated rate or as fast as possible. Messages arrive either through the
+mock group that the bot polls or straight through the callback handler. Reports how many
+replies would fire, the busiest stretches of the original history, queueing delay and the
+generation load it caused, for capacity planning before pointing the bot at a busy group.
+
+Run from the repository root:
+    python -m benchmarks.replay inspiring_messages.csv --speed 3600 --via poll
+"""
+
+import csv
+import json
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+from collections import Counter
+from typing import Dict, List
+
+from benchmarks.harness import (
+    LatencyTracker, QueueSampler, create_controller, drain, print_latency, print_requests, wait_for, write_config
+)
+from benchmarks.mock_servers import MockGroupMe, MockOpenAI
+
+def load_messages(path: str, limit: int = None) -> List[Dict]:
+    """
+    Load a scraper CSV or a message corpus, oldest message first.
+
+    Returns:
+        List[Dict]: Rows with message_id, timestamp (int), likes (int), user_id, user_name and text
+    """
+    if path.endswith(('.arrow', '.parquet')):
+        from groupme.message_corpus import load_corpus
+        table = load_corpus(path, ['message_id', 'timestamp', 'likes', 'user_id', 'user_name', 'text'])
+        if limit:
+            table = table.slice(0, limit)
+        # Corpora are already typed and sorted; the mock expects string IDs like the API's
+        return [{**row, 'message_id': str(row['message_id']), 'user_id': row['user_id'] or "0"} for row in table.to_pylist()]
+
+    rows = []
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            if not row.get("message_id") or not row.get("timestamp"):
+                continue
+            rows.append({
+                "message_id": row["message_id"],
+                "timestamp": int(float(row["timestamp"])),
+                "likes": int(float(row.get("likes") or 0)),
+                "user_id": row.get("user_id") or "0",
+                "user_name": row.get("user_name") or "Unknown",
+                "text": row.get("text") or "",
+            })
+    rows.sort(key=lambda row: (row["timestamp"], int(row["message_id"])))
+    return rows[:limit] if limit else rows
+
+def parse_speed(value: str) -> float:
+    """Parse --speed: 'real' (1x), 'max' (no waiting) or a speed-up factor."""
+    if value == "real":
+        return 1.0
+    if value == "max":
+        return float("inf")
+    speed = float(value)
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("speed must be positive")
+    return speed
+
+async def replay(controller, groupme: MockGroupMe, rows: List[Dict], speed: float, via: str) -> None:
+    """Inject rows on the original timeline scaled by speed."""
+    first_timestamp = rows[0]["timestamp"]
+    started = time.monotonic()
+    for i, row in enumerate(rows):
+        if speed != float("inf"):
+            delay = (row["timestamp"] - first_timestamp) / speed - (time.monotonic() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        elif i % 100 == 0:
+            await asyncio.sleep(0)  # Let the bot run between bursts
+        message = groupme.add_message(
+            row["text"], user_id=row["user_id"], name=row["user_name"], likes=row["likes"],
+            created_at=row["timestamp"], message_id=row["message_id"]
+        )
+        if via == "callback":
+            await controller.handle_callback(message)
+
+def busiest(counts: Counter, top: int = 3) -> List[Dict]:
+    """The busiest time buckets, most messages first."""
+    return [{'bucket_start': time.strftime("%Y-%m-%d %H:%M", time.localtime(bucket)), 'count': count}
+            for bucket, count in counts.most_common(top)]
+
+async def run(args: argparse.Namespace) -> Dict:
+    """Replay the CSV and return the results."""
+    rows = load_messages(args.csv, args.limit)
+    if not rows:
+        raise ValueError(f"No messages found in {args.csv}")
+
+    groupme = MockGroupMe(latency=args.groupme_latency)
+    openai_mock = MockOpenAI(latency=args.openai_latency, latency_jitter=args.openai_jitter,
+                             error_rate=args.openai_error_rate, rate_limit_per_minute=args.openai_rpm)
+    await groupme.start()
+    await openai_mock.start()
+
+    # The bot's own reply dice and generation settings apply unless overridden
+    overrides = {
+        "ingestion_mode": "webhook" if args.via == "callback" else "polling",
+        "random_messages_per_day": 0,
+        "warm_pool_size_per_type": 0,
+        "min_polling_interval_seconds": args.poll_interval,
+        "polling_interval_seconds": args.poll_interval,
+    }
+    for key in ("reply_chance_per_like", "minimum_reply_chance", "generation_concurrency", "generation_queue_size"):
+        if getattr(args, key) is not None:
+            overrides[key] = getattr(args, key)
+
+    scratch = tempfile.TemporaryDirectory(prefix="kellerbot-replay-")
+    controller = create_controller(groupme, openai_mock, write_config(scratch.name, overrides), unthrottled=True)
+
+    # Record every reply decision with the original message time
+    original_time = {row["message_id"]: row["timestamp"] for row in rows}
+    decisions = []
+    decide_reply = controller.message_manager.decide_reply
+
+    def recording_decide_reply(reply_to_id: str, original_message: str, likes: int) -> Dict:
+        decision = decide_reply(reply_to_id, original_message, likes)
+        decisions.append((reply_to_id, decision))
+        return decision
+
+    controller.message_manager.decide_reply = recording_decide_reply
+
+    tracker = LatencyTracker(controller, groupme)
+    tracker.start()
+    sampler = QueueSampler(controller)
+    sampler.start()
+    await controller.start_polling()
+    if args.via == "poll" and not await wait_for(lambda: controller.groupme_interface.last_message_id is not None, 30):
+        raise RuntimeError("Bot never completed its first poll against the mock GroupMe")
+
+    started = time.perf_counter()
+    await replay(controller, groupme, rows, args.speed, args.via)
+    replay_seconds = time.perf_counter() - started
+    drained = await wait_for(lambda: len(decisions) >= len(original_time), args.drain_timeout)
+    drained = drained and await drain(controller, args.drain_timeout)
+    elapsed = time.perf_counter() - started
+
+    await tracker.stop()
+    await sampler.stop()
+    await controller.close()
+    await openai_mock.stop()
+    await groupme.stop()
+    scratch.cleanup()
+
+    bucket_seconds = args.bucket_minutes * 60
+    messages_per_bucket = Counter(row["timestamp"] // bucket_seconds * bucket_seconds for row in rows)
+    replies_per_bucket = Counter(
+        original_time[reply_to_id] // bucket_seconds * bucket_seconds
+        for reply_to_id, decision in decisions if decision['reply'] and reply_to_id in original_time
+    )
+    replies = sum(1 for _, decision in decisions if decision['reply'])
+    span_seconds = rows[-1]["timestamp"] - rows[0]["timestamp"]
+    stats = controller.generation_scheduler.get_stats()
+
+    return {
+        'settings': {**vars(args), 'speed': str(args.speed)},
+        'drained': drained,
+        'history': {
+            'messages': len(rows),
+            'span_hours': round(span_seconds / 3600, 2),
+            'first': time.strftime("%Y-%m-%d %H:%M", time.localtime(rows[0]["timestamp"])),
+            'last': time.strftime("%Y-%m-%d %H:%M", time.localtime(rows[-1]["timestamp"])),
+        },
+        'replay': {
+            'replay_seconds': round(replay_seconds, 2),
+            'elapsed_seconds': round(elapsed, 2),
+            'effective_speedup': round(span_seconds / replay_seconds, 1) if replay_seconds else None,
+        },
+        'replies': {
+            'decisions': len(decisions),
+            'fired': replies,
+            'fire_rate': round(replies / len(decisions), 4) if decisions else 0,
+            'mentions_keller': sum(1 for _, decision in decisions if decision['mentions_keller']),
+            'finished': len(tracker.all_candidates),
+            'candidates': tracker.candidates,
+            'per_history_day': round(replies / (span_seconds / 86400), 2) if span_seconds else None,
+        },
+        'busiest_buckets': {
+            'bucket_minutes': args.bucket_minutes,
+            'messages': busiest(messages_per_bucket),
+            'replies': busiest(replies_per_bucket),
+        },
+        'latency': tracker.get_latency(),
+        'generation_queue': stats,
+        'generation_load': sampler.get_stats(),
+        'openai_tokens': {'input': openai_mock.input_tokens, 'output': openai_mock.output_tokens_total},
+        'requests': {
+            'groupme': groupme.get_request_counts(),
+            'openai': openai_mock.get_request_counts(),
+        },
+    }
+
+def print_report(results: Dict) -> None:
+    """Print the results in a readable form."""
+    history = results['history']
+    replay_info = results['replay']
+    replies = results['replies']
+    print("\n📼 KellerBot replay")
+    print(f"  History: {history['messages']} messages over {history['span_hours']}h ({history['first']} to {history['last']})")
+    print(f"  Replayed in {replay_info['replay_seconds']}s ({replay_info['effective_speedup']}x), "
+          f"{replay_info['elapsed_seconds']}s including drain{'' if results['drained'] else ' (drain timed out)'}")
+    print(f"  Replies: {replies['fired']} of {replies['decisions']} messages ({replies['fire_rate']:.1%}), "
+          f"{replies['mentions_keller']} mention Keller, {replies['per_history_day']} per day of history")
+    print(f"  Generated: {replies['finished']} replies, {replies['candidates']} candidates")
+    buckets = results['busiest_buckets']
+    print(f"  Busiest {buckets['bucket_minutes']}-minute windows:")
+    for kind in ('messages', 'replies'):
+        print(f"    {kind:9} " + ", ".join(f"{b['bucket_start']} ({b['count']})" for b in buckets[kind]))
+    print_latency(results['latency'])
+    queue = results['generation_queue']
+    load = results['generation_load']
+    print(f"  Generation jobs: {queue['completed']} completed, {queue['failed']} failed, {queue['dropped']} dropped "
+          f"(peak {load['peak']} queued+running, mean {load['mean']})")
+    tokens = results['openai_tokens']
+    print(f"  OpenAI tokens: {tokens['input']} input, {tokens['output']} output")
+    print_requests(results['requests'])
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Replay a GroupMe message CSV through KellerBot against mock backends.")
+    parser.add_argument("csv", help="Message CSV in the GroupMeScraper format, or an .arrow/.parquet corpus")
+    parser.add_argument("--speed", type=parse_speed, default=parse_speed("max"),
+                        help="'real', 'max' (default) or a speed-up factor such as 3600 (an hour per second)")
+    parser.add_argument("--via", choices=("poll", "callback"), default="poll",
+                        help="Deliver messages through the polled mock group or the callback handler")
+    parser.add_argument("--limit", type=int, default=None, help="Only replay the oldest N messages")
+    parser.add_argument("--bucket-minutes", type=int, default=60, help="Window size for the busiest-period report")
+    parser.add_argument("--drain-timeout", type=float, default=120, help="Seconds to wait for generation after the replay")
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this JSON file")
+    parser.add_argument("--verbose", action="store_true", help="Show the bot's log output")
+
+    bot = parser.add_argument_group("bot config (defaults come from server/config.json)")
+    bot.add_argument("--reply-chance-per-like", dest="reply_chance_per_like", type=float, default=None)
+    bot.add_argument("--minimum-reply-chance", dest="minimum_reply_chance", type=float, default=None)
+    bot.add_argument("--concurrency", dest="generation_concurrency", type=int, default=None)
+    bot.add_argument("--queue-size", dest="generation_queue_size", type=int, default=None)
+    bot.add_argument("--poll-interval", type=float, default=1.0, help="Minimum polling interval in seconds")
+
+    mocks = parser.add_argument_group("mock servers")
+    mocks.add_argument("--groupme-latency", type=float, default=0.05, help="Seconds per GroupMe response")
+    mocks.add_argument("--openai-latency", type=float, default=1.0, help="Seconds per OpenAI response")
+    mocks.add_argument("--openai-jitter", type=float, default=0.5, help="Extra random seconds per OpenAI response")
+    mocks.add_argument("--openai-error-rate", type=float, default=0.0, help="Fraction of OpenAI requests failing with 500")
+    mocks.add_argument("--openai-rpm", type=float, default=None, help="OpenAI server rate limit (requests/minute)")
+    return parser
+
+def main() -> None:
+    args = build_parser().parse_args()
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+    results = asyncio.run(run(args))
+    print_report(results)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to {args.json_path}")
+
+if __name__ == "__main__":
+    main()
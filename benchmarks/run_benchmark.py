@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+End-to-end KellerBot benchmark against local mock GroupMe and OpenAI servers.
+
+Injects group messages into the mock GroupMe at a Poisson rate, lets BotController poll,
+roll the reply dice and generate candidates through the mock OpenAI, and reports latency
+percentiles, throughput, request counts and memory. No network access or API keys needed.
+
+Run from the repository root:
+    python -m benchmarks.run_benchmark --duration 30 --rate 2 --openai-latency 1.5
+"""
+
+import gc
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+import resource
+import tempfile
+import tracemalloc
+from typing import Dict
+
+from benchmarks.harness import (
+    LatencyTracker, QueueSampler, create_controller, drain, print_latency, print_requests, wait_for, write_config
+)
+from benchmarks.mock_servers import MockGroupMe, MockOpenAI
+
+def bot_config(args: argparse.Namespace) -> Dict:
+    """Config overrides for a run."""
+    return {
+        "random_messages_per_day": args.random_per_day,
+        "minimum_reply_chance": args.reply_chance,
+        "message_generation_tries": args.tries,
+        "batched_generation": not args.unbatched,
+        "generation_concurrency": args.concurrency,
+        "generation_queue_size": args.queue_size,
+        "polling_interval_seconds": args.poll_interval,
+        "min_polling_interval_seconds": args.poll_interval,
+        "max_polling_interval_seconds": max(args.poll_interval, 10),
+        "warm_pool_size_per_type": args.warm_pool,
+    }
+
+async def inject_messages(groupme: MockGroupMe, args: argparse.Namespace) -> int:
+    """Post messages to the mock group at a Poisson rate for the configured duration."""
+    injected = 0
+    deadline = time.monotonic() + args.duration
+    while True:
+        await asyncio.sleep(random.expovariate(args.rate))
+        if time.monotonic() >= deadline:
+            return injected
+        injected += 1
+        text = f"Benchmark message {injected}"
+        if random.random() < args.mention_rate:
+            text += " - what does keller think?"
+        groupme.add_message(text, user_id=str(1001 + injected % 20), name=f"Member {injected % 20}",
+                            likes=random.randint(0, args.max_likes))
+
+async def run(args: argparse.Namespace) -> Dict:
+    """Run one benchmark and return the results."""
+    if args.tracemalloc:
+        tracemalloc.start()
+
+    groupme = MockGroupMe(latency=args.groupme_latency, error_rate=args.groupme_error_rate,
+                          rate_limit_per_minute=args.groupme_rpm)
+    openai_mock = MockOpenAI(latency=args.openai_latency, latency_jitter=args.openai_jitter,
+                             error_rate=args.openai_error_rate, rate_limit_per_minute=args.openai_rpm,
+                             rate_limit_burst=args.openai_burst)
+    await groupme.start()
+    await openai_mock.start()
+
+    scratch = tempfile.TemporaryDirectory(prefix="kellerbot-bench-")
+    controller = create_controller(groupme, openai_mock, write_config(scratch.name, bot_config(args)), args.unthrottled)
+
+    tracker = LatencyTracker(controller, groupme)
+    tracker.start()
+    sampler = QueueSampler(controller)
+    sampler.start()
+    await controller.start_polling()
+    if not await wait_for(lambda: controller.groupme_interface.last_message_id is not None, 30):
+        raise RuntimeError("Bot never completed its first poll against the mock GroupMe")
+
+    started = time.perf_counter()
+    injected = await inject_messages(groupme, args)
+    injection_seconds = time.perf_counter() - started
+
+    # Let in-flight generation finish before measuring
+    drained = await wait_for(lambda: len(tracker.ingest) >= injected, args.drain_timeout)
+    drained = drained and await drain(controller, args.drain_timeout)
+    elapsed = time.perf_counter() - started
+
+    await tracker.stop()
+    await sampler.stop()
+    await controller.close()
+    await openai_mock.stop()
+    await groupme.stop()
+    scratch.cleanup()
+
+    gc.collect()
+    memory = {'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)}
+    if args.tracemalloc:
+        current, peak = tracemalloc.get_traced_memory()
+        memory.update({'traced_current_mb': round(current / 2**20, 2), 'traced_peak_mb': round(peak / 2**20, 2)})
+        tracemalloc.stop()
+
+    stats = controller.generation_scheduler.get_stats()
+    return {
+        'settings': vars(args),
+        'drained': drained,
+        'elapsed_seconds': round(elapsed, 2),
+        'messages': {
+            'injected': injected,
+            'ingested': len(tracker.ingest),
+            'replies_started': len(tracker.generation_start),
+            'replies_finished': len(tracker.all_candidates),
+            'candidates': tracker.candidates,
+        },
+        'throughput_per_second': {
+            'injected': round(injected / injection_seconds, 3) if injection_seconds else 0,
+            'ingested': round(len(tracker.ingest) / elapsed, 3),
+            'replies_finished': round(len(tracker.all_candidates) / elapsed, 3),
+            'candidates': round(tracker.candidates / elapsed, 3),
+        },
+        'latency': tracker.get_latency(),
+        'generation_queue': stats,
+        'generation_load': sampler.get_stats(),
+        'prompt_cache': controller.message_manager.message_generator.get_prompt_cache_stats(),
+        'requests': {
+            'groupme': groupme.get_request_counts(),
+            'openai': openai_mock.get_request_counts(),
+        },
+        'memory': memory,
+    }
+
+def print_report(results: Dict) -> None:
+    """Print the results in a readable form."""
+    messages = results['messages']
+    print("\n📊 KellerBot benchmark")
+    print(f"  Elapsed: {results['elapsed_seconds']}s{'' if results['drained'] else ' (drain timed out)'}")
+    print(f"  Messages: {messages['injected']} injected, {messages['ingested']} ingested, "
+          f"{messages['replies_finished']}/{messages['replies_started']} replies finished, {messages['candidates']} candidates")
+    print("  Throughput (/s): " + ", ".join(f"{name} {value}" for name, value in results['throughput_per_second'].items()))
+    print_latency(results['latency'])
+    queue = results['generation_queue']
+    load = results['generation_load']
+    print(f"  Generation jobs: {queue['completed']} completed, {queue['failed']} failed, {queue['dropped']} dropped "
+          f"(peak {load['peak']} queued+running, mean {load['mean']})")
+    cache = results['prompt_cache']
+    print(f"  Prompt cache: {cache['requests']} requests, token hit rate {cache['token_hit_rate']:.2%}")
+    print_requests(results['requests'])
+    print("  Memory: " + ", ".join(f"{name} {value}" for name, value in results['memory'].items()))
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Benchmark KellerBot end to end against mock GroupMe and OpenAI servers.")
+    load = parser.add_argument_group("load")
+    load.add_argument("--duration", type=float, default=30, help="Seconds to inject messages for")
+    load.add_argument("--rate", type=float, default=1.0, help="Group messages per second (Poisson arrivals)")
+    load.add_argument("--max-likes", type=int, default=5, help="Likes per message are uniform from 0 to this")
+    load.add_argument("--mention-rate", type=float, default=0.1, help="Fraction of messages mentioning Keller")
+    load.add_argument("--drain-timeout", type=float, default=60, help="Seconds to wait for generation to finish after injecting")
+
+    bot = parser.add_argument_group("bot config")
+    bot.add_argument("--reply-chance", type=float, default=1.0, help="Minimum reply chance (1.0 replies to everything)")
+    bot.add_argument("--random-per-day", type=float, default=0, help="Random messages per day")
+    bot.add_argument("--tries", type=int, default=5, help="Candidates per message")
+    bot.add_argument("--unbatched", action="store_true", help="One OpenAI request per candidate")
+    bot.add_argument("--concurrency", type=int, default=2, help="Generation workers")
+    bot.add_argument("--queue-size", type=int, default=20, help="Generation queue size")
+    bot.add_argument("--poll-interval", type=float, default=1.0, help="Minimum polling interval in seconds")
+    bot.add_argument("--warm-pool", type=int, default=0, help="Warm pool size per message type")
+    bot.add_argument("--unthrottled", action="store_true", help="Disable the client-side GroupMe rate limiter")
+
+    mocks = parser.add_argument_group("mock servers")
+    mocks.add_argument("--groupme-latency", type=float, default=0.05, help="Seconds per GroupMe response")
+    mocks.add_argument("--groupme-error-rate", type=float, default=0.0, help="Fraction of GroupMe requests failing with 500")
+    mocks.add_argument("--groupme-rpm", type=float, default=None, help="GroupMe server rate limit (requests/minute)")
+    mocks.add_argument("--openai-latency", type=float, default=1.0, help="Seconds per OpenAI response")
+    mocks.add_argument("--openai-jitter", type=float, default=0.5, help="Extra random seconds per OpenAI response")
+    mocks.add_argument("--openai-error-rate", type=float, default=0.0, help="Fraction of OpenAI requests failing with 500")
+    mocks.add_argument("--openai-rpm", type=float, default=None, help="OpenAI server rate limit (requests/minute)")
+    mocks.add_argument("--openai-burst", type=int, default=10, help="OpenAI rate limit burst size")
+
+    output = parser.add_argument_group("output")
+    output.add_argument("--json", dest="json_path", help="Also write the results to this JSON file")
+    output.add_argument("--tracemalloc", action="store_true", help="Track Python heap usage (slower)")
+    output.add_argument("--verbose", action="store_true", help="Show the bot's log output")
+    return parser
+
+def main() -> None:
+    args = build_parser().parse_args()
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+    results = asyncio.run(run(args))
+    print_report(results)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to {args.json_path}")
+
+if __name__ == "__main__":
+    main()
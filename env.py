@@ -16,3 +16,6 @@ GROUPME_ACCESS_TOKEN = os.getenv('GROUPME_ACCESS_TOKEN')
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 
 BOT_GROUP_ID = os.getenv('BOT_GROUP_ID', None)
+
+# Shared secret required as ?token= on the GroupMe bot callback URL; webhook ingestion needs it
+GROUPME_CALLBACK_TOKEN = os.getenv('GROUPME_CALLBACK_TOKEN')
@@ -0,0 +1,371 @@
+import time
+import asyncio
+import httpx
+from typing import List, Dict, Optional
+from env import GROUPME_ACCESS_TOKEN
+from groupme.rate_limiter import MAX_THROTTLE_RETRIES, rate_limiter
+from resilience import CircuitOpenError, call_with_retry, get_breaker
+
+class AsyncGroupMeInterface:
+    """
+    Async interface for interacting with GroupMe API, mirroring GroupMeInterface.
+    Uses a single pooled keep-alive HTTP client so GroupMe round trips never block the event loop.
+    """
+
+    def __init__(self, bot_group_id: str = None, access_token: str = None, timeout: float = 10.0, bot_info_ttl: float = 60.0):
+        """
+        Initialize the async GroupMe interface.
+
+        The current user is looked up lazily on first use, since the constructor cannot await.
+
+        Args:
+            bot_group_id (str): The GroupMe group ID for the bot server.
+            access_token (str): GroupMe API access token. If None, will load from env.
+            timeout (float): Per-request timeout in seconds.
+            bot_info_ttl (float): Seconds cached bot server info is served before a background refresh.
+        """
+        self.access_token = access_token or GROUPME_ACCESS_TOKEN
+        if not self.access_token:
+            raise ValueError("GroupMe access token is required. Set GROUPME_ACCESS_TOKEN in .env file or pass as parameter.")
+
+        self.bot_group_id = bot_group_id
+        self.last_message_id = None  # Cursor: newest message ID seen in the bot server
+        self.current_user_id = None
+        self.poll_page_size = 100  # GroupMe maximum
+        self.max_poll_pages = 10  # Upper bound on catch-up paging per poll
+
+        self.base_url = "https://api.groupme.com/v3"
+        self.headers = {
+            'X-Access-Token': self.access_token,
+            'Content-Type': 'application/json'
+        }
+        self.timeout = timeout
+        self.max_throttle_retries = MAX_THROTTLE_RETRIES
+        self._client: Optional[httpx.AsyncClient] = None
+
+        # Stale-while-revalidate cache for get_cached_bot_server_info
+        self.bot_info_ttl = bot_info_ttl
+        self._bot_info: Optional[Dict] = None
+        self._bot_info_fetched_at: Optional[float] = None
+        self._bot_info_refresh: Optional[asyncio.Task] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Get the shared HTTP client, creating it on first use."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                headers=self.headers,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=10, max_keepalive_connections=5)
+            )
+        return self._client
+
+    async def _request(self, method: str, url: str, endpoint: str = None, **kwargs) -> httpx.Response:
+        """
+        Make a request through the shared GroupMe rate limiter (see RateLimiter.request_async).
+
+        Transient failures are retried with backoff behind the shared GroupMe circuit breaker.
+        GETs retry on any transport error or 5xx; POSTs only when the connection was never
+        made, so a message is never sent twice.
+
+        Args:
+            method (str): HTTP method
+            url (str): Request URL
+            endpoint (str): Rate limiter endpoint budget name
+            **kwargs: Passed through to httpx
+
+        Returns:
+            httpx.Response: The final response (may still be a 429 once retries run out)
+
+        Raises:
+            httpx.HTTPError: If the request still fails after retries
+            CircuitOpenError: If GroupMe is considered down
+        """
+        if method == 'GET':
+            retry_on = (httpx.TransportError, httpx.HTTPStatusError)
+        else:
+            retry_on = (httpx.ConnectError, httpx.ConnectTimeout)
+
+        async def attempt() -> httpx.Response:
+            response = await rate_limiter.request_async(
+                lambda: self._get_client().request(method, url, **kwargs), endpoint, self.max_throttle_retries
+            )
+            if response.status_code >= 500:
+                response.raise_for_status()
+            return response
+
+        return await call_with_retry(attempt, get_breaker('groupme'), retry_on)
+
+    async def close(self) -> None:
+        """Close the pooled HTTP client."""
+        if self._bot_info_refresh is not None and not self._bot_info_refresh.done():
+            self._bot_info_refresh.cancel()
+        self._bot_info_refresh = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _get_current_user(self) -> None:
+        """Get and store the current authenticated user's information."""
+        url = f"{self.base_url}/users/me"
+
+        try:
+            response = await self._request('GET', url, 'users')
+            response.raise_for_status()
+            data = response.json()
+            user_info = data.get('response', {})
+            self.current_user_id = user_info.get('id')
+
+            if not self.current_user_id:
+                raise ValueError("Could not determine current user ID")
+
+        except (httpx.HTTPError, CircuitOpenError) as e:
+            raise ValueError(f"Error fetching current user info: {e}")
+
+    async def _ensure_current_user(self) -> None:
+        """Fetch the current user if it hasn't been loaded yet."""
+        if self.current_user_id is None:
+            await self._get_current_user()
+
+    def set_bot_server(self, group_id: str) -> None:
+        """
+        Set the bot server group ID.
+
+        Args:
+            group_id (str): The GroupMe group ID for the bot server
+        """
+        self.bot_group_id = group_id
+        self.last_message_id = None  # Reset cursor when changing servers
+        # Drop the cached info; an in-flight refresh for the old group discards its result
+        self._bot_info = None
+        self._bot_info_fetched_at = None
+        self._bot_info_refresh = None
+
+    async def get_user_groups(self) -> List[Dict]:
+        """
+        Get a list of all groups the current user is a member of.
+
+        Returns:
+            List[Dict]: List of group information dictionaries
+
+        Raises:
+            ValueError: If access token is invalid or API request fails
+        """
+        url = f"{self.base_url}/groups"
+        params = {'per_page': 100}
+
+        try:
+            response = await self._request('GET', url, 'groups', params=params)
+            response.raise_for_status()
+            data = response.json()
+            return data.get('response', [])
+
+        except (httpx.HTTPError, CircuitOpenError) as e:
+            raise ValueError(f"Error fetching groups: {e}")
+
+    async def poll_new_messages(self) -> List[Dict]:
+        """
+        Poll for new messages in the bot server since last check.
+        Only returns messages from other users (filters out current user).
+
+        Tracks the newest seen message ID and asks GroupMe only for messages after it,
+        paging forward until caught up, so bursts larger than one page are never dropped.
+        The cursor only advances once every page has been fetched, so a failed poll is
+        retried from the same place. The first poll only seeds the cursor and returns an
+        empty list.
+
+        Returns:
+            List[Dict]: List of new message dictionaries with reply information, oldest first
+
+        Raises:
+            ValueError: If bot server is not set or the API request fails
+        """
+        if not self.bot_group_id:
+            raise ValueError("Bot server group ID not set. Use set_bot_server() first.")
+
+        await self._ensure_current_user()
+
+        url = f"{self.base_url}/groups/{self.bot_group_id}/messages"
+
+        try:
+            if self.last_message_id is None:
+                # First run, just remember where the conversation currently is
+                messages = await self._fetch_messages(url, {'limit': 1})
+                # An empty group starts before every message ID, so its first messages are picked up
+                self.last_message_id = messages[0].get('id') if messages else '0'
+                return []
+
+            new_messages = []
+            cursor = self.last_message_id
+            for _ in range(self.max_poll_pages):
+                params = {'limit': self.poll_page_size, 'after_id': cursor}
+                messages = await self._fetch_messages(url, params)
+                if not messages:
+                    break
+
+                # after_id pages are oldest first, but don't rely on it
+                messages.sort(key=lambda m: (m.get('created_at', 0), int(m.get('id', 0))))
+                cursor = messages[-1].get('id')
+
+                for msg in messages:
+                    # Filter out messages from current user
+                    if msg.get('user_id') != self.current_user_id:
+                        new_messages.append(self._format_message(msg))
+
+                if len(messages) < self.poll_page_size:
+                    break
+
+            self.last_message_id = cursor
+            return new_messages
+
+        except (httpx.HTTPError, CircuitOpenError) as e:
+            raise ValueError(f"Error fetching messages from bot server: {e}")
+
+    async def _fetch_messages(self, url: str, params: Dict) -> List[Dict]:
+        """Fetch one page of group messages, treating 304 Not Modified as an empty page."""
+        response = await self._request('GET', url, 'messages', params=params)
+        if response.status_code == 304:
+            return []
+        response.raise_for_status()
+        data = response.json()
+        return data.get('response', {}).get('messages', [])
+
+    def _format_message(self, msg: Dict) -> Dict:
+        """Extract only necessary information for replies from a raw GroupMe message."""
+        return {
+            'id': msg.get('id'),
+            'text': msg.get('text', ''),
+            'user_id': msg.get('user_id'),
+            'name': msg.get('name', 'Unknown'),
+            'created_at': msg.get('created_at'),
+            'likes': len(msg.get('favorited_by', [])),
+            'group_id': self.bot_group_id,
+            'reply_to_id': msg.get('id'),  # For API reply functionality
+            'username': msg.get('name', 'Unknown')  # Username for reply formatting
+        }
+
+    async def parse_callback_message(self, payload: Dict) -> Optional[Dict]:
+        """
+        Convert a GroupMe bot callback payload into the same shape poll_new_messages returns.
+
+        Args:
+            payload (Dict): JSON body GroupMe POSTs to the bot callback URL
+
+        Returns:
+            Dict: Message information, or None if the message should be ignored
+                (other group, system/bot message, or sent by the current user)
+        """
+        if not payload or not payload.get('id'):
+            return None
+        if self.bot_group_id and str(payload.get('group_id')) != str(self.bot_group_id):
+            return None
+        if payload.get('system') or payload.get('sender_type') not in (None, 'user'):
+            return None
+        await self._ensure_current_user()
+        if payload.get('user_id') == self.current_user_id:
+            return None
+        return self._format_message(payload)
+
+    async def send_message(self, text: str, reply_to_id: str = None) -> Dict:
+        """
+        Send a message in the bot server.
+
+        Args:
+            text (str): The message text to send
+            reply_to_id (str): Optional message ID to reply to
+
+        Returns:
+            Dict: Response from the API containing message details
+
+        Raises:
+            ValueError: If bot server is not set, text is empty, or API request fails
+        """
+        if not self.bot_group_id:
+            raise ValueError("Bot server group ID not set. Use set_bot_server() first.")
+
+        if not text.strip():
+            raise ValueError("Message text cannot be empty")
+
+        url = f"{self.base_url}/groups/{self.bot_group_id}/messages"
+
+        # Prepare message data
+        message_data = {
+            'message': {
+                'source_guid': str(int(time.time())),  # Unique identifier
+                'text': text
+            }
+        }
+
+        # Add reply attachment if specified
+        if reply_to_id:
+            message_data['message']['attachments'] = [
+                {
+                    'type': 'reply',
+                    'reply_id': reply_to_id,
+                    'base_reply_id': reply_to_id
+                }
+            ]
+
+        try:
+            response = await self._request('POST', url, 'send', json=message_data)
+            response.raise_for_status()
+            return response.json()
+
+        except (httpx.HTTPError, CircuitOpenError) as e:
+            raise ValueError(f"Error sending message: {e}")
+
+    async def get_bot_server_info(self) -> Optional[Dict]:
+        """
+        Get information about the currently set bot server.
+
+        Returns:
+            Dict: Bot server information or None if not set
+        """
+        if not self.bot_group_id:
+            return None
+
+        try:
+            url = f"{self.base_url}/groups/{self.bot_group_id}"
+            response = await self._request('GET', url, 'group')
+            response.raise_for_status()
+            data = response.json()
+            return data.get('response', {})
+
+        except (httpx.HTTPError, CircuitOpenError):
+            return None
+
+    async def get_cached_bot_server_info(self) -> Optional[Dict]:
+        """
+        Get bot server info from a TTL cache, refreshing it in the background once stale.
+
+        Only the very first call (or the first after set_bot_server) waits for GroupMe;
+        after that callers always get the cached value immediately. A failed refresh keeps
+        the previous value and is retried after another TTL.
+
+        Returns:
+            Dict: Bot server information or None if not set or not fetched yet
+        """
+        if not self.bot_group_id:
+            return None
+
+        if self._bot_info_fetched_at is None:
+            # Shield so a cancelled caller doesn't cancel the fetch other callers share
+            await asyncio.shield(self._start_bot_info_refresh())
+        elif time.monotonic() - self._bot_info_fetched_at > self.bot_info_ttl:
+            self._start_bot_info_refresh()
+        return self._bot_info
+
+    def _start_bot_info_refresh(self) -> asyncio.Task:
+        """Start a bot server info refresh unless one is already running."""
+        if self._bot_info_refresh is None or self._bot_info_refresh.done():
+            self._bot_info_refresh = asyncio.create_task(self._refresh_bot_server_info())
+        return self._bot_info_refresh
+
+    async def _refresh_bot_server_info(self) -> None:
+        """Fetch bot server info into the cache."""
+        group_id = self.bot_group_id
+        info = await self.get_bot_server_info()
+        if group_id != self.bot_group_id:
+            return  # Bot server changed while fetching
+        if info is not None:
+            self._bot_info = info
+        self._bot_info_fetched_at = time.monotonic()
@@ -4,6 +4,7 @@ import time
 from datetime import datetime
 from typing import List, Dict, Optional
 from env import GROUPME_ACCESS_TOKEN
+from groupme.rate_limiter import MAX_THROTTLE_RETRIES, rate_limiter
 
 class GroupMeInterface:
     """
@@ -32,16 +33,23 @@ class GroupMeInterface:
             'X-Access-Token': self.access_token,
             'Content-Type': 'application/json'
         }
+        self.max_throttle_retries = MAX_THROTTLE_RETRIES
         
         # Get current user info on initialization
         self._get_current_user()
     
+    def _request(self, method: str, url: str, endpoint: str = None, **kwargs) -> requests.Response:
+        """Make a request through the shared GroupMe rate limiter (see RateLimiter.request)."""
+        return rate_limiter.request(
+            lambda: requests.request(method, url, headers=self.headers, **kwargs), endpoint, self.max_throttle_retries
+        )
+    
     def _get_current_user(self) -> None:
         """Get and store the current authenticated user's information."""
         url = f"{self.base_url}/users/me"
         
         try:
-            response = requests.get(url, headers=self.headers)
+            response = self._request('GET', url, 'users')
             response.raise_for_status()
             data = response.json()
             user_info = data.get('response', {})
@@ -80,7 +88,7 @@ class GroupMeInterface:
         params = {'per_page': 100}
         
         try:
-            response = requests.get(url, headers=self.headers, params=params)
+            response = self._request('GET', url, 'groups', params=params)
             response.raise_for_status()
             data = response.json()
             return data.get('response', [])
@@ -109,7 +117,7 @@ class GroupMeInterface:
         params = {'limit': 100}
         
         try:
-            response = requests.get(url, headers=self.headers, params=params)
+            response = self._request('GET', url, 'messages', params=params)
             response.raise_for_status()
             data = response.json()
             messages = data.get('response', {}).get('messages', [])
@@ -191,7 +199,7 @@ class GroupMeInterface:
             ]
         
         try:
-            response = requests.post(url, headers=self.headers, json=message_data)
+            response = self._request('POST', url, 'send', json=message_data)
             response.raise_for_status()
             return response.json()
             
@@ -210,7 +218,7 @@ class GroupMeInterface:
         
         try:
             url = f"{self.base_url}/groups/{self.bot_group_id}"
-            response = requests.get(url, headers=self.headers)
+            response = self._request('GET', url, 'group')
             response.raise_for_status()
             data = response.json()
             return data.get('response', {})
@@ -1,12 +1,38 @@
 import requests
 import json
-import time
-import pandas as pd
+import threading
 from datetime import datetime
 from typing import List, Dict
 import os
 from dotenv import load_dotenv
 from env import GROUPME_ACCESS_TOKEN
+from groupme.rate_limiter import MAX_THROTTLE_RETRIES, rate_limiter
+
+# Columns of the scraper's CSV output, in order
+MESSAGE_FIELDS = ['message_id', 'timestamp', 'datetime', 'user_name', 'user_id', 'text', 'attachments', 'likes', 'group_id', 'source']
+
+def format_message(msg: Dict) -> Dict:
+    """
+    Flatten a raw GroupMe message into a row with MESSAGE_FIELDS.
+    
+    Args:
+        msg (Dict): Message as returned by the GroupMe API
+        
+    Returns:
+        Dict: The CSV row
+    """
+    return {
+        'message_id': msg.get('id'),
+        'timestamp': msg.get('created_at'),
+        'datetime': datetime.fromtimestamp(msg.get('created_at', 0)).isoformat(),
+        'user_name': msg.get('name', 'Unknown'),
+        'user_id': msg.get('user_id'),
+        'text': msg.get('text', ''),
+        'attachments': len(msg.get('attachments') or []),
+        'likes': len(msg.get('favorited_by') or []),
+        'group_id': msg.get('group_id'),
+        'source': (msg.get('source') or {}).get('type', 'unknown')
+    }
 
 class GroupMeScraper:
     """
@@ -29,22 +55,49 @@ class GroupMeScraper:
             'X-Access-Token': self.access_token,
             'Content-Type': 'application/json'
         }
+        self.max_throttle_retries = MAX_THROTTLE_RETRIES
+        self._local = threading.local()  # One keep-alive session per thread
     
-    def display_groups(self) -> List[Dict]:
+    def _session(self) -> requests.Session:
+        """Get this thread's HTTP session, creating it on first use."""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(self.headers)
+            self._local.session = session
+        return session
+    
+    def _request(self, method: str, url: str, endpoint: str = None, **kwargs) -> requests.Response:
+        """Make a request on this thread's session through the shared GroupMe rate limiter (see RateLimiter.request)."""
+        return rate_limiter.request(
+            lambda: self._session().request(method, url, **kwargs), endpoint, self.max_throttle_retries
+        )
+    
+    def list_groups(self) -> List[Dict]:
         """
-        Display a list of all groups the user is a member of.
+        Get all groups the user is a member of, without printing.
         
         Returns:
             List[Dict]: List of group information dictionaries
+            
+        Raises:
+            requests.exceptions.RequestException: If the request fails
         """
         url = f"{self.base_url}/groups"
         params = {'per_page': 100}
+        response = self._request('GET', url, 'groups', params=params)
+        response.raise_for_status()
+        return response.json().get('response', [])
+    
+    def display_groups(self) -> List[Dict]:
+        """
+        Display a list of all groups the user is a member of.
         
+        Returns:
+            List[Dict]: List of group information dictionaries
+        """
         try:
-            response = requests.get(url, headers=self.headers, params=params)
-            response.raise_for_status()
-            data = response.json()
-            groups = data.get('response', [])
+            groups = self.list_groups()
             
             print(f"\nFound {len(groups)} groups:")
             for i, group in enumerate(groups, 1):
@@ -58,29 +111,52 @@ class GroupMeScraper:
             print(f"Error fetching groups: {e}")
             return []
     
-    def get_group_messages(self, group_id: str, limit: int = 100, before_id: str = None) -> List[Dict]:
+    def fetch_messages_page(self, group_id: str, before_id: str = None, after_id: str = None, limit: int = 100) -> List[Dict]:
         """
-        Get a batch of messages from a specific group.
+        Fetch one page of group messages, raising on errors instead of returning an empty page.
+        
+        Without after_id the page is newest first (older than before_id if given); with
+        after_id it is the oldest messages newer than after_id, oldest first.
         
         Args:
             group_id (str): The GroupMe group ID
+            before_id (str): Only return messages older than this message ID
+            after_id (str): Only return messages newer than this message ID
             limit (int): Number of messages to retrieve (max 100)
-            before_id (str): Message ID to get messages before (for pagination)
             
         Returns:
-            List[Dict]: List of message dictionaries
+            List[Dict]: Raw message dictionaries, empty when there are no more messages
+            
+        Raises:
+            requests.exceptions.RequestException: If the request fails
         """
         url = f"{self.base_url}/groups/{group_id}/messages"
         params = {'limit': min(limit, 100)}
-        
         if before_id:
             params['before_id'] = before_id
+        if after_id:
+            params['after_id'] = after_id
+        
+        response = self._request('GET', url, 'messages', params=params)
+        if response.status_code == 304:  # GroupMe answers 304 when there is nothing left
+            return []
+        response.raise_for_status()
+        return response.json().get('response', {}).get('messages', [])
+    
+    def get_group_messages(self, group_id: str, limit: int = 100, before_id: str = None) -> List[Dict]:
+        """
+        Get a batch of messages from a specific group.
+        
+        Args:
+            group_id (str): The GroupMe group ID
+            limit (int): Number of messages to retrieve (max 100)
+            before_id (str): Message ID to get messages before (for pagination)
             
+        Returns:
+            List[Dict]: List of message dictionaries
+        """
         try:
-            response = requests.get(url, headers=self.headers, params=params)
-            response.raise_for_status()
-            data = response.json()
-            return data.get('response', {}).get('messages', [])
+            return self.fetch_messages_page(group_id, before_id=before_id, limit=limit)
         except requests.exceptions.RequestException as e:
             print(f"Error fetching messages for group {group_id}: {e}")
             return []
@@ -91,6 +167,10 @@ class GroupMeScraper:
         Only retrieves the current user's messages and stops at July 2021.
         This method can handle tens of thousands of messages by loading in batches of 100.
         
+        Pages are appended to the CSV as they arrive, with a checkpoint next to it, so an
+        interrupted run resumes where it stopped and running it again on the same file only
+        fetches messages newer than the last run.
+        
         Args:
             group_id (str): The GroupMe group ID
             group_name (str): Name of the group (for filename if not provided)
@@ -99,9 +179,7 @@ class GroupMeScraper:
         Returns:
             str: Path to the exported CSV file
         """
-        all_messages = []
-        before_id = None
-        batch_count = 0
+        from groupme.scrape_engine import ScrapeEngine
         
         # Get current user info to filter messages
         current_user = self.get_current_user()
@@ -119,78 +197,22 @@ class GroupMeScraper:
         # July 2021 timestamp (July 1, 2021)
         july_2021_timestamp = 1625097600
         
-        while True:
-            batch_count += 1
-            print(f"Fetching batch {batch_count}...")
-            
-            try:
-                messages = self.get_group_messages(group_id, limit=100, before_id=before_id)
-                
-                if not messages:
-                    print(f"Batch {batch_count} returned no messages - reached the end")
-                    break
-                
-                # Filter to only current user's messages
-                user_messages = [msg for msg in messages if msg.get('user_id') == current_user_id]
-                
-                # Check if any messages are from July 2021 or earlier
-                old_messages = [msg for msg in user_messages if msg.get('created_at', 0) <= july_2021_timestamp]
-                
-                if old_messages:
-                    print(f"Batch {batch_count}: Found messages from July 2021 or earlier. Stopping.")
-                    # Add only the newer messages from this batch
-                    newer_messages = [msg for msg in user_messages if msg.get('created_at', 0) > july_2021_timestamp]
-                    all_messages.extend(newer_messages)
-                    break
-                
-                all_messages.extend(user_messages)
-                print(f"Batch {batch_count}: Retrieved {len(user_messages)} of your messages. Total so far: {len(all_messages)}")
-                
-                # Get the ID of the oldest message for next pagination
-                before_id = messages[-1]['id']
-                
-                # Rate limiting - GroupMe allows 60 requests per minute
-                time.sleep(1.1)
-                
-            except Exception as e:
-                print(f"Error fetching batch {batch_count}: {e}")
-                break
+        # Generate filename if not provided (stable, so later runs resume and sync the same file)
+        if not filename:
+            if not group_name:
+                group_name = f"group_{group_id}"
+            filename = f"{current_user_name}_{group_name}_messages.csv"
+        
+        engine = ScrapeEngine(self, max_workers=1, only_user_id=current_user_id, since=july_2021_timestamp)
+        result = engine.scrape_groups([{'id': group_id, 'name': group_name, 'path': filename}], os.path.dirname(filename) or ".")[0]
         
-        print(f"\nRetrieved {len(all_messages)} of your messages in {batch_count} batches")
+        print(f"\nRetrieved {result['written']} new messages of yours in {result['pages']} batches ({result['total']} saved in total)")
         
-        if not all_messages:
+        if not os.path.exists(filename):
             print("No messages to save")
             return ""
         
-        # Format messages for CSV
-        formatted_messages = []
-        for msg in all_messages:
-            formatted_msg = {
-                'message_id': msg.get('id'),
-                'timestamp': msg.get('created_at'),
-                'datetime': datetime.fromtimestamp(msg.get('created_at', 0)).isoformat(),
-                'user_name': msg.get('name', 'Unknown'),
-                'user_id': msg.get('user_id'),
-                'text': msg.get('text', ''),
-                'attachments': len(msg.get('attachments', [])),
-                'likes': len(msg.get('favorited_by', [])),
-                'group_id': msg.get('group_id'),
-                'source': msg.get('source', {}).get('type', 'unknown')
-            }
-            formatted_messages.append(formatted_msg)
-        
-        # Generate filename if not provided
-        if not filename:
-            if not group_name:
-                group_name = f"group_{group_id}"
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"{current_user_name}_{group_name}_messages_{timestamp}.csv"
-        
-        # Save to CSV
-        df = pd.DataFrame(formatted_messages)
-        df.to_csv(filename, index=False)
         print(f"Messages saved to: {filename}")
-        
         return filename
     
     def get_current_user(self) -> Dict:
@@ -203,7 +225,7 @@ class GroupMeScraper:
         url = f"{self.base_url}/users/me"
         
         try:
-            response = requests.get(url, headers=self.headers)
+            response = self._request('GET', url, 'users')
             response.raise_for_status()
             data = response.json()
             user_info = data.get('response', {})
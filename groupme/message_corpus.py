@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Columnar message corpora: scraper output converted to Arrow or Parquet with proper types.
+
+CSV has to be re-parsed and re-typed on every load. A corpus file stores each column once,
+already typed:
+    message_id, timestamp    int64
+    text                     string
+    attachments, likes       int32
+    user_id, user_name,      dictionary-encoded strings (categoricals), so a name repeated
+    group_id, source         across 100k messages is stored once
+The ISO datetime column is dropped because timestamp carries the same information.
+Rows are deduplicated on message_id and sorted oldest first.
+
+Arrow IPC files (.arrow) are written uncompressed. load_corpus memory-maps them, so a load
+reads only the selected columns' pages and does no parsing or copying. Parquet files
+(.parquet) are zstd-compressed, which suits archiving and sharing; they are decoded on load.
+
+Convert scraper output from the repository root:
+    python -m groupme.message_corpus scraped/*.csv inspiring_messages.csv -o corpus.arrow
+"""
+
+import os
+import csv
+import json
+import time
+import argparse
+from typing import Dict, Iterator, List, Sequence
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+CORPUS_SCHEMA = pa.schema([
+    ('message_id', pa.int64()),
+    ('timestamp', pa.int64()),
+    ('user_name', pa.dictionary(pa.int32(), pa.string())),
+    ('user_id', pa.dictionary(pa.int32(), pa.string())),
+    ('text', pa.string()),
+    ('attachments', pa.int32()),
+    ('likes', pa.int32()),
+    ('group_id', pa.dictionary(pa.int32(), pa.string())),
+    ('source', pa.dictionary(pa.int32(), pa.string())),
+])
+CORPUS_EXTENSIONS = ('.arrow', '.parquet')
+
+def iter_rows(path: str) -> Iterator[Dict]:
+    """
+    Stream rows from scraper output, CSV or JSON Lines (by extension).
+
+    Yields:
+        Dict: Rows with the scraper's fields, values as read
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.endswith('.jsonl'):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(f)
+
+def _to_int(value) -> int:
+    """Parse an integer column value, tolerating blanks and "12.0"."""
+    return int(float(value)) if value not in (None, '') else 0
+
+def _to_batch(rows: List[Dict]) -> pa.RecordBatch:
+    """Convert rows to a record batch with CORPUS_SCHEMA."""
+    def strings(name: str, default: str) -> pa.Array:
+        values = [str(row.get(name) or default) for row in rows]
+        return pa.array(values, pa.string()).dictionary_encode()
+
+    return pa.RecordBatch.from_arrays([
+        pa.array([int(row['message_id']) for row in rows], pa.int64()),
+        pa.array([_to_int(row.get('timestamp')) for row in rows], pa.int64()),
+        strings('user_name', 'Unknown'),
+        strings('user_id', ''),
+        pa.array([row.get('text') or '' for row in rows], pa.string()),
+        pa.array([_to_int(row.get('attachments')) for row in rows], pa.int32()),
+        pa.array([_to_int(row.get('likes')) for row in rows], pa.int32()),
+        strings('group_id', ''),
+        strings('source', 'unknown'),
+    ], schema=CORPUS_SCHEMA)
+
+def build_table(source_paths: Sequence[str], batch_size: int = 65536) -> pa.Table:
+    """
+    Read scraper output files into one typed table, deduplicated on message_id, oldest first.
+
+    Rows are converted in batches, so only the Arrow columns (not Python rows) are held in memory.
+
+    Args:
+        source_paths (Sequence[str]): CSV or JSON Lines files in the scraper format
+        batch_size (int): Rows converted at a time
+
+    Returns:
+        pa.Table: The corpus
+    """
+    seen = set()
+    batches = []
+    rows = []
+    for path in source_paths:
+        for row in iter_rows(path):
+            if not row.get('message_id'):
+                continue
+            message_id = int(row['message_id'])
+            if message_id in seen:
+                continue
+            seen.add(message_id)
+            rows.append(row)
+            if len(rows) >= batch_size:
+                batches.append(_to_batch(rows))
+                rows = []
+    if rows:
+        batches.append(_to_batch(rows))
+
+    table = pa.Table.from_batches(batches, schema=CORPUS_SCHEMA)
+    table = table.sort_by([('timestamp', 'ascending'), ('message_id', 'ascending')])
+    # One dictionary per column across all batches, as the Arrow IPC file format requires
+    return table.unify_dictionaries().combine_chunks()
+
+def write_corpus(table: pa.Table, path: str) -> None:
+    """
+    Write a corpus table, as Arrow IPC or Parquet depending on the extension.
+
+    Raises:
+        ValueError: If the extension is not .arrow or .parquet
+    """
+    if path.endswith('.parquet'):
+        pq.write_table(table, path, compression='zstd')
+    elif path.endswith('.arrow'):
+        # Uncompressed so load_corpus can memory-map it without decoding
+        feather.write_feather(table, path, compression='uncompressed')
+    else:
+        raise ValueError(f"Corpus path must end in one of {CORPUS_EXTENSIONS}: {path}")
+
+def export_corpus(source_paths: Sequence[str], path: str) -> pa.Table:
+    """
+    Convert scraper output files into a corpus file.
+
+    Returns:
+        pa.Table: The table that was written
+    """
+    table = build_table(source_paths)
+    write_corpus(table, path)
+    return table
+
+def load_corpus(path: str, columns: Sequence[str] = None, memory_map: bool = True) -> pa.Table:
+    """
+    Load a corpus file, memory-mapped by default.
+
+    Args:
+        path (str): .arrow or .parquet corpus
+        columns (Sequence[str]): Columns to read (all if None); others are never touched
+        memory_map (bool): Map the file instead of reading it into memory
+
+    Returns:
+        pa.Table: The corpus, oldest message first
+    """
+    columns = list(columns) if columns is not None else None
+    if path.endswith('.parquet'):
+        return pq.read_table(path, columns=columns, memory_map=memory_map)
+    return feather.read_table(path, columns=columns, memory_map=memory_map)
+
+def load_texts(path: str, min_likes: int = 0, user_id: str = None) -> List[str]:
+    """
+    Load message texts from a corpus, e.g. as prompt examples.
+
+    Args:
+        path (str): .arrow or .parquet corpus
+        min_likes (int): Only messages with at least this many likes
+        user_id (str): Only messages from this user
+
+    Returns:
+        List[str]: Non-empty texts, oldest first
+    """
+    columns = ['text', 'likes'] + (['user_id'] if user_id is not None else [])
+    table = load_corpus(path, columns)
+    mask = pc.and_(pc.greater_equal(table['likes'], min_likes), pc.not_equal(table['text'], ''))
+    if user_id is not None:
+        mask = pc.and_(mask, pc.equal(table['user_id'].cast(pa.string()), user_id))
+    return table.filter(mask)['text'].to_pylist()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Convert GroupMe scraper CSV/JSONL output into an Arrow or Parquet corpus.")
+    parser.add_argument("sources", nargs="+", help="Scraper output files (.csv or .jsonl)")
+    parser.add_argument("-o", "--output", required=True, help="Corpus file to write (.arrow or .parquet)")
+    args = parser.parse_args()
+
+    if not args.output.endswith(CORPUS_EXTENSIONS):
+        parser.error(f"--output must end in one of {CORPUS_EXTENSIONS}")
+
+    started = time.perf_counter()
+    table = export_corpus(args.sources, args.output)
+    elapsed = time.perf_counter() - started
+    print(f"✅ {table.num_rows} messages from {len(args.sources)} files -> {args.output} "
+          f"({os.path.getsize(args.output) / 2**20:.1f} MB) in {elapsed:.2f}s")
+
+    started = time.perf_counter()
+    load_corpus(args.output, ['timestamp', 'likes'])
+    print(f"📖 Loading timestamp and likes takes {(time.perf_counter() - started) * 1000:.1f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Streaming writers for scraped GroupMe messages.
+
+Rows are formatted and appended as each page arrives and then synced to disk, so memory use
+stays constant no matter how long a group's history is. CSV output keeps the scraper's
+columns; JSON Lines output has the same fields with numbers left as numbers.
+"""
+
+import os
+import csv
+import json
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable
+
+from groupme.groupme_scraper import MESSAGE_FIELDS, format_message
+
+class MessageWriter(ABC):
+    """Base class: appends message rows to one file."""
+
+    extension = ""
+
+    def __init__(self, path: str, append: bool = False):
+        """
+        Open the output file.
+
+        Args:
+            path (str): Output file
+            append (bool): Add to the rows already in the file instead of starting it over
+        """
+        self.path = path
+        self.file = open(path, 'a' if append else 'w', newline='', encoding='utf-8')
+        if not append:
+            self._write_header()
+
+    def _write_header(self) -> None:
+        """Write whatever starts a new file."""
+
+    @abstractmethod
+    def write_rows(self, rows: Iterable[Dict]) -> int:
+        """
+        Append formatted rows.
+
+        Returns:
+            int: Number of rows written
+        """
+
+    def write_messages(self, messages: Iterable[Dict]) -> int:
+        """
+        Format raw GroupMe messages and append them.
+
+        Returns:
+            int: Number of rows written
+        """
+        return self.write_rows(format_message(msg) for msg in messages)
+
+    def sync(self) -> int:
+        """
+        Flush everything written so far to disk.
+
+        Returns:
+            int: File size in bytes, which a checkpoint can record
+        """
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return os.fstat(self.file.fileno()).st_size
+
+    def close(self) -> None:
+        self.file.close()
+
+class CsvMessageWriter(MessageWriter):
+    """CSV with a header row, in the scraper's column order."""
+
+    extension = "csv"
+
+    def __init__(self, path: str, append: bool = False):
+        super().__init__(path, append)
+        self.writer = csv.DictWriter(self.file, fieldnames=MESSAGE_FIELDS)
+
+    def _write_header(self) -> None:
+        csv.DictWriter(self.file, fieldnames=MESSAGE_FIELDS).writeheader()
+
+    def write_rows(self, rows: Iterable[Dict]) -> int:
+        count = 0
+        for row in rows:
+            self.writer.writerow(row)
+            count += 1
+        return count
+
+class JsonlMessageWriter(MessageWriter):
+    """One JSON object per line."""
+
+    extension = "jsonl"
+
+    def write_rows(self, rows: Iterable[Dict]) -> int:
+        count = 0
+        for row in rows:
+            self.file.write(json.dumps(row, ensure_ascii=False) + "\n")
+            count += 1
+        return count
+
+# Output format name -> writer class
+WRITERS = {writer.extension: writer for writer in (CsvMessageWriter, JsonlMessageWriter)}
+
+def get_writer_class(output_format: str) -> type:
+    """
+    Get the writer class for a format name.
+
+    Raises:
+        ValueError: If the format is not supported
+    """
+    if output_format not in WRITERS:
+        raise ValueError(f"Unsupported output format {output_format!r}, expected one of {sorted(WRITERS)}")
+    return WRITERS[output_format]
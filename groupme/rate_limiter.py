@@ -0,0 +1,173 @@
+import time
+import asyncio
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+# GroupMe allows roughly 60 requests per minute per access token.
+# Budgets are (requests per minute, burst size).
+GLOBAL_BUDGET = (60, 10)
+ENDPOINT_BUDGETS = {
+    'send': (20, 3),  # Posting messages
+    'group': (12, 2),  # Bot server info, refreshed by the dashboard
+}
+DEFAULT_RETRY_AFTER = 10.0
+MAX_THROTTLE_RETRIES = 3  # 429 responses waited out per request before giving up
+
+class TokenBucket:
+    """A thread-safe token bucket refilled continuously at a fixed rate."""
+
+    def __init__(self, per_minute: float, burst: int):
+        """
+        Initialize the bucket full.
+
+        Args:
+            per_minute (float): Sustained requests per minute
+            burst (int): Maximum number of requests that can be made back to back
+        """
+        self.rate = per_minute / 60.0
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        """Add the tokens earned since the last refill."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def time_until_available(self) -> float:
+        """Get seconds until a token is available, without taking one."""
+        with self.lock:
+            self._refill(time.monotonic())
+            if self.tokens >= 1:
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        """Take a token (may go negative if called without checking first)."""
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens -= 1
+
+class RateLimiter:
+    """
+    Process-wide GroupMe rate limiter.
+
+    Every request takes a token from the global bucket and, if the endpoint has its own
+    budget, from that endpoint's bucket. A 429 response pauses all requests until the
+    server's Retry-After has passed. Usable from both sync code (acquire) and async code
+    (acquire_async); async waiters sleep on the event loop instead of blocking it.
+    """
+
+    def __init__(self, global_budget: Tuple[float, int] = GLOBAL_BUDGET, endpoint_budgets: Dict[str, Tuple[float, int]] = None):
+        """
+        Initialize the rate limiter.
+
+        Args:
+            global_budget (Tuple[float, int]): (requests per minute, burst) shared by all endpoints
+            endpoint_budgets (Dict): Endpoint name -> (requests per minute, burst)
+        """
+        self.global_bucket = TokenBucket(*global_budget)
+        budgets = ENDPOINT_BUDGETS if endpoint_budgets is None else endpoint_budgets
+        self.endpoint_buckets = {name: TokenBucket(*budget) for name, budget in budgets.items()}
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def _try_acquire(self, endpoint: str = None) -> float:
+        """Take tokens if all buckets allow it. Returns 0 on success or the seconds to wait."""
+        with self.lock:
+            wait = self.blocked_until - time.monotonic()
+            buckets = [self.global_bucket]
+            if endpoint in self.endpoint_buckets:
+                buckets.append(self.endpoint_buckets[endpoint])
+            for bucket in buckets:
+                wait = max(wait, bucket.time_until_available())
+            if wait > 0:
+                return wait
+            for bucket in buckets:
+                bucket.take()
+            return 0.0
+
+    def acquire(self, endpoint: str = None) -> None:
+        """Block the current thread until a request to the endpoint is allowed."""
+        while True:
+            wait = self._try_acquire(endpoint)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self, endpoint: str = None) -> None:
+        """Wait on the event loop until a request to the endpoint is allowed."""
+        while True:
+            wait = self._try_acquire(endpoint)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def record_throttled(self, retry_after: Optional[str] = None) -> float:
+        """
+        Pause all requests after a 429 response.
+
+        Args:
+            retry_after (str): Value of the Retry-After header, in seconds or as an HTTP date
+
+        Returns:
+            float: Seconds requests will be paused for
+        """
+        delay = parse_retry_after(retry_after)
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+        return delay
+
+    def _throttled(self, response) -> bool:
+        """Whether a response is a 429; if so, pause all requests per its Retry-After."""
+        if response.status_code != 429:
+            return False
+        self.record_throttled(response.headers.get('Retry-After'))
+        return True
+
+    def request(self, send: Callable, endpoint: str = None, max_throttle_retries: int = MAX_THROTTLE_RETRIES):
+        """
+        Make a request within the budget, waiting out 429 responses per Retry-After.
+
+        Args:
+            send (Callable): Makes the HTTP request and returns the response (requests or httpx)
+            endpoint (str): Endpoint budget name
+            max_throttle_retries (int): 429 responses to wait out before giving up
+
+        Returns:
+            The final response (may still be a 429 once retries run out)
+        """
+        for _ in range(max_throttle_retries + 1):
+            self.acquire(endpoint)
+            response = send()
+            if not self._throttled(response):
+                break
+        return response
+
+    async def request_async(self, send: Callable[[], Awaitable], endpoint: str = None,
+                            max_throttle_retries: int = MAX_THROTTLE_RETRIES):
+        """Async version of request: send returns an awaitable response."""
+        for _ in range(max_throttle_retries + 1):
+            await self.acquire_async(endpoint)
+            response = await send()
+            if not self._throttled(response):
+                break
+        return response
+
+def parse_retry_after(value: Optional[str]) -> float:
+    """Parse a Retry-After header into seconds, falling back to DEFAULT_RETRY_AFTER."""
+    if not value:
+        return DEFAULT_RETRY_AFTER
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER
+
+# Shared by every GroupMe client in the process
+rate_limiter = RateLimiter()
@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+"""
+Concurrent, non-interactive GroupMe history scraper.
+
+Backfills many groups at once. Each group gets a fetch worker that walks its history newest
+first through GroupMeScraper, and so through the shared GroupMe rate limiter. The workers hand
+every page to a single writer thread, which formats it and appends it to that group's CSV or
+JSON Lines file (see groupme.message_writer), so memory use does not grow with history length.
+Fetching the next page overlaps with writing the previous one. Groups share the request budget
+instead of queueing behind each other, so total wall time is bounded by the budget rather than
+by the sum of per-page round trips.
+
+Each output file has a checkpoint next to it (group_<id>.csv.checkpoint.json). It records the
+oldest and newest message IDs written, whether the backfill reached the start of history (or
+the --since date), and the file size at that point. The writer saves the checkpoint only after
+the page is on disk. An interrupted run resumes paging from the oldest ID, and a partial page
+written after the last checkpoint is truncated away. Later runs first fetch only the messages
+newer than the newest ID, so a nightly refresh costs about one request per group. Backfill pages
+are appended newest first and sync pages oldest first; sort by timestamp when reading.
+
+With --archive the writer also upserts every page into the SQLite message archive
+(server.message_archive), so scraped history becomes searchable as it arrives.
+
+Run from the repository root:
+    python -m groupme.scrape_engine --all --out scraped
+    python -m groupme.scrape_engine 12345678 87654321 --since 2021-07-01 --mine
+"""
+
+import os
+import json
+import time
+import queue
+import argparse
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import requests
+from dotenv import load_dotenv
+from groupme.groupme_scraper import GroupMeScraper
+from groupme.message_writer import MessageWriter, WRITERS, get_writer_class
+from groupme.rate_limiter import rate_limiter, TokenBucket
+from resilience import backoff_delay
+from server.message_archive import MessageArchive
+
+def checkpoint_path_for(path: str) -> str:
+    """Get the checkpoint file that goes with an output file."""
+    return path + ".checkpoint.json"
+
+def new_checkpoint(group_id: str, only_user_id: str = None) -> Dict:
+    """Checkpoint for a group that has not been scraped yet."""
+    return {
+        'group_id': group_id,
+        'only_user_id': only_user_id,  # User filter the output was written with, None for everyone
+        'oldest_id': None,  # Backfill resumes before this message
+        'newest_id': None,  # Sync fetches messages after this one
+        'backfill_complete': False,
+        'backfilled_to': None,  # The since cutoff the backfill stopped at, None for all history
+        'bytes': 0,  # Output file size when the checkpoint was saved
+        'messages': 0,  # Rows written to the output file
+        'updated_at': None,
+    }
+
+def load_checkpoint(group_id: str, path: str, only_user_id: str = None) -> Dict:
+    """
+    Load the checkpoint for an output file and reconcile the file with it.
+
+    A missing checkpoint or output file means starting over, and so does a checkpoint written
+    with a different user filter. Output written after the last checkpoint (a page interrupted
+    mid-write) is truncated away.
+
+    Returns:
+        Dict: The checkpoint
+    """
+    checkpoint_path = checkpoint_path_for(path)
+    if not os.path.exists(checkpoint_path):
+        return new_checkpoint(group_id, only_user_id)
+    with open(checkpoint_path, 'r') as f:
+        checkpoint = {**new_checkpoint(group_id), **json.load(f)}
+    if checkpoint['only_user_id'] != only_user_id:
+        print(f"⚠️ {path} was scraped with a different user filter, scraping it again from scratch")
+        return new_checkpoint(group_id, only_user_id)
+    size = os.path.getsize(path) if os.path.exists(path) else 0
+    if size < checkpoint['bytes']:
+        print(f"⚠️ {path} is shorter than its checkpoint says, scraping it again from scratch")
+        return new_checkpoint(group_id, only_user_id)
+    if size > checkpoint['bytes']:
+        os.truncate(path, checkpoint['bytes'])
+    return checkpoint
+
+def save_checkpoint(path: str, checkpoint: Dict) -> None:
+    """Atomically save the checkpoint for an output file."""
+    checkpoint['updated_at'] = datetime.now().isoformat()
+    checkpoint_path = checkpoint_path_for(path)
+    temp_path = checkpoint_path + ".tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(temp_path, checkpoint_path)
+
+class GroupScrape:
+    """Progress and output state for one group being scraped."""
+
+    def __init__(self, group_id: str, name: str, path: str, checkpoint: Dict):
+        self.group_id = group_id
+        self.name = name
+        self.path = path
+        self.checkpoint = checkpoint
+        self.pages = 0
+        self.fetched = 0
+        self.written = 0
+        self.error: Optional[str] = None
+        self.write_failed = False  # Once set, the writer drops the group's remaining pages
+        self.writer: Optional[MessageWriter] = None
+        self.started = time.monotonic()
+        self.finished: Optional[float] = None
+
+    def to_dict(self) -> Dict:
+        """Summary of the scrape, for reports."""
+        end = self.finished or time.monotonic()
+        return {
+            'group_id': self.group_id,
+            'name': self.name,
+            'path': self.path,
+            'pages': self.pages,
+            'fetched': self.fetched,
+            'written': self.written,
+            'total': self.checkpoint['messages'],
+            'backfill_complete': self.checkpoint['backfill_complete'],
+            'seconds': round(end - self.started, 2),
+            'error': self.error,
+        }
+
+class ScrapeEngine:
+    """
+    Scrapes the full history of several groups concurrently into one file per group, resuming
+from and then syncing forward from each group's checkpoint.
+
+    Fetch workers run in a thread pool, one group per worker. A bounded page queue between
+    them and the writer thread applies backpressure if writing falls behind.
+    """
+
+    def __init__(self, scraper: GroupMeScraper = None, max_workers: int = 4, page_queue_size: int = 32,
+                 max_attempts: int = 5, only_user_id: str = None, since: int = None, output_format: str = "csv",
+                 archive: MessageArchive = None):
+        """
+        Initialize the engine.
+
+        Args:
+            scraper (GroupMeScraper): Scraper to fetch with (a new one if None)
+            max_workers (int): Groups fetched at the same time
+            page_queue_size (int): Pages buffered between the fetchers and the writer
+            max_attempts (int): Tries per page before giving up on a group
+            only_user_id (str): Only keep messages from this user (None keeps everyone's)
+            since (int): Only keep messages created after this Unix timestamp, and stop paging there
+            output_format (str): "csv" or "jsonl"
+            archive (MessageArchive): Also add every written page to this archive
+        """
+        self.writer_class = get_writer_class(output_format)
+        self.scraper = scraper or GroupMeScraper()
+        self.max_workers = max_workers
+        self.max_attempts = max_attempts
+        self.only_user_id = only_user_id
+        self.since = since
+        self.archive = archive
+        self.pages: queue.Queue = queue.Queue(maxsize=page_queue_size)
+        self.stop_event = threading.Event()
+        self.writer_thread: Optional[threading.Thread] = None
+
+    def scrape_groups(self, groups: List[Dict], output_dir: str) -> List[Dict]:
+        """
+        Scrape every group into output_dir/group_<id>.csv (or .jsonl), or
+        output_dir/group_<id>_user_<user id>.csv when only one user's messages are kept.
+
+        Args:
+            groups (List[Dict]): Groups with 'id' and optionally 'name' and an explicit output 'path'
+            output_dir (str): Directory for the output of groups without an explicit path
+
+        Returns:
+            List[Dict]: Per-group summaries (see GroupScrape.to_dict)
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        scrapes = []
+        for group in groups:
+            group_id = str(group['id'])
+            stem = f"group_{group_id}" if self.only_user_id is None else f"group_{group_id}_user_{self.only_user_id}"
+            path = group.get('path') or os.path.join(output_dir, f"{stem}.{self.writer_class.extension}")
+            checkpoint = load_checkpoint(group_id, path, self.only_user_id)
+            scrapes.append(GroupScrape(group_id, group.get('name') or f"group_{group_id}", path, checkpoint))
+
+        self.writer_thread = threading.Thread(target=self._write_pages, name="scrape-writer", daemon=True)
+        self.writer_thread.start()
+        pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="scrape-fetch")
+        try:
+            for future in [pool.submit(self._fetch_group, scrape) for scrape in scrapes]:
+                future.result()
+        except KeyboardInterrupt:
+            self.stop_event.set()
+            print("\n⏹️ Stopping: finishing in-flight pages...")
+            raise
+        finally:
+            pool.shutdown(wait=True)
+            self._put(None)
+            self.writer_thread.join()
+        for scrape in scrapes:
+            if scrape.finished is None and scrape.error is None:
+                scrape.error = "writer stopped before the group was finished"
+        return [scrape.to_dict() for scrape in scrapes]
+
+    def stop(self) -> None:
+        """Ask the fetch workers to stop after their current page."""
+        self.stop_event.set()
+
+    def _fetch_page(self, scrape: GroupScrape, before_id: Optional[str] = None, after_id: Optional[str] = None) -> List[Dict]:
+        """
+        Fetch one page, retrying server and connection errors with backoff.
+
+        Raises:
+            requests.exceptions.RequestException: Client errors at once, others once attempts run out
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                return self.scraper.fetch_messages_page(scrape.group_id, before_id=before_id, after_id=after_id)
+            except requests.exceptions.RequestException as e:
+                status = getattr(e.response, 'status_code', None)
+                if (status is not None and 400 <= status < 500) or attempt == self.max_attempts:
+                    raise
+                delay = backoff_delay(attempt, 1.0, 30.0)
+                print(f"🔁 {scrape.name}: page failed ({e}), retry {attempt}/{self.max_attempts - 1} in {delay:.1f}s")
+                time.sleep(delay)
+
+    def _needs_backfill(self, checkpoint: Dict) -> bool:
+        """Whether older history than the checkpoint covers is wanted."""
+        if not checkpoint['backfill_complete']:
+            return True
+        # A previous backfill stopped at a cutoff later than the one asked for now
+        return checkpoint['backfilled_to'] is not None and (self.since is None or self.since < checkpoint['backfilled_to'])
+
+    def _fetch_group(self, scrape: GroupScrape) -> None:
+        """Sync messages newer than the checkpoint, then page back through older history."""
+        # Snapshot: the writer updates the checkpoint while this runs
+        checkpoint = dict(scrape.checkpoint)
+        resuming = checkpoint['newest_id'] is not None
+        print(f"📥 {scrape.name}: {'syncing' if resuming else 'starting'}")
+        try:
+            if resuming:
+                self._sync_newer(scrape, checkpoint['newest_id'])
+            if self._needs_backfill(checkpoint) and not self.stop_event.is_set():
+                self._backfill(scrape, checkpoint['oldest_id'], set_newest=not resuming)
+        except requests.exceptions.RequestException as e:
+            scrape.error = str(e)
+            print(f"❌ {scrape.name}: stopped after {scrape.pages} pages: {e}")
+        finally:
+            # The writer closes the file and reports once it has written everything queued before this
+            self._put((scrape, None, {}))
+
+    def _sync_newer(self, scrape: GroupScrape, after_id: str) -> None:
+        """Fetch the messages posted since the newest one in the checkpoint, oldest first."""
+        while not self.stop_event.is_set():
+            messages = self._fetch_page(scrape, after_id=after_id)
+            if not messages:
+                return
+            messages.sort(key=lambda m: (m.get('created_at', 0), int(m.get('id', 0))))
+            after_id = messages[-1]['id']
+            self._queue_page(scrape, messages, {'newest_id': after_id})
+            if len(messages) < 100:
+                return  # A short page means we have caught up
+
+    def _backfill(self, scrape: GroupScrape, before_id: Optional[str], set_newest: bool) -> None:
+        """Page back through history from before_id (or the newest message), newest first."""
+        while not self.stop_event.is_set():
+            messages = self._fetch_page(scrape, before_id=before_id)
+            if not messages:
+                break
+            update = {'oldest_id': messages[-1]['id']}
+            if set_newest:
+                update['newest_id'] = messages[0]['id']
+                set_newest = False
+            reached_cutoff = self.since is not None and messages[-1].get('created_at', 0) <= self.since
+            if reached_cutoff:
+                # Stop the checkpoint at the cutoff, so a later run with an earlier --since resumes
+                # from the first message this one skipped rather than from the end of the page
+                kept = [msg for msg in messages if msg.get('created_at', 0) > self.since]
+                if kept:
+                    update['oldest_id'] = kept[-1]['id']
+                else:
+                    # GroupMe IDs are numeric; one past the newest resumes with this whole page
+                    update['oldest_id'] = before_id or str(int(messages[0]['id']) + 1)
+            self._queue_page(scrape, messages, update)
+            if reached_cutoff:
+                break
+            before_id = messages[-1]['id']
+        else:
+            return  # Stopped early; the next run resumes from oldest_id
+        self._put((scrape, [], {'backfill_complete': True, 'backfilled_to': self.since}))
+
+    def _queue_page(self, scrape: GroupScrape, messages: List[Dict], update: Dict) -> None:
+        """Hand a page to the writer along with the checkpoint fields to save once it is written."""
+        scrape.pages += 1
+        scrape.fetched += len(messages)
+        self._put((scrape, messages, update))
+
+    def _put(self, item) -> None:
+        """Queue an item for the writer, giving up (and stopping the fetchers) if the writer has exited."""
+        while True:
+            try:
+                self.pages.put(item, timeout=1.0)
+                return
+            except queue.Full:
+                if not self.writer_thread.is_alive():
+                    self.stop_event.set()
+                    return
+
+    def _keep(self, msg: Dict) -> bool:
+        """Whether a fetched message passes the user and date filters."""
+        if self.only_user_id is not None and msg.get('user_id') != self.only_user_id:
+            return False
+        return self.since is None or msg.get('created_at', 0) > self.since
+
+    def _write_pages(self) -> None:
+        """
+        Writer thread: append queued pages to their group's file, then advance its checkpoint.
+
+        After a failed write the group's later pages are dropped, so its checkpoint never moves
+        past the gap and the next run truncates the partial output and refetches from there.
+        """
+        while True:
+            item = self.pages.get()
+            if item is None:
+                return
+            scrape, messages, update = item
+            try:
+                if messages is None:
+                    self._finish(scrape)
+                elif not scrape.write_failed:
+                    self._write_page(scrape, messages, update)
+            except Exception as e:
+                # Keep the thread alive; the fetchers block on the queue if nothing drains it
+                scrape.write_failed = True
+                scrape.error = f"write failed: {e}"
+                print(f"❌ {scrape.name}: {scrape.error}")
+                self.stop_event.set()
+
+    def _write_page(self, scrape: GroupScrape, messages: List[Dict], update: Dict) -> None:
+        """Write one page and save the checkpoint once it is on disk."""
+        kept = [msg for msg in messages if self._keep(msg)]
+        if kept:
+            if scrape.writer is None:
+                # Append after the checkpointed rows; a fresh checkpoint starts the file over
+                scrape.writer = self.writer_class(scrape.path, append=bool(scrape.checkpoint['bytes']))
+            written = scrape.writer.write_messages(kept)
+            scrape.checkpoint['bytes'] = scrape.writer.sync()
+            scrape.checkpoint['messages'] += written
+            scrape.written += written
+            if self.archive is not None:
+                self.archive.add_api_messages(kept, "scrape")
+        scrape.checkpoint.update(update)
+        save_checkpoint(scrape.path, scrape.checkpoint)
+
+    def _finish(self, scrape: GroupScrape) -> None:
+        """Close a group's output and report it."""
+        scrape.finished = time.monotonic()
+        if scrape.writer is not None:
+            writer, scrape.writer = scrape.writer, None
+            writer.close()
+        if scrape.error is None:
+            status = "" if scrape.checkpoint['backfill_complete'] else " (history incomplete, run again to resume)"
+            print(f"✅ {scrape.name}: {scrape.written} new messages from {scrape.pages} pages in "
+                  f"{scrape.finished - scrape.started:.1f}s, {scrape.checkpoint['messages']} total -> {scrape.path}{status}")
+
+def parse_date(value: str) -> int:
+    """Parse a YYYY-MM-DD date (local time) into a Unix timestamp."""
+    try:
+        return int(datetime.strptime(value, "%Y-%m-%d").timestamp())
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM-DD, got {value!r}")
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Scrape the history of several GroupMe groups concurrently into CSV or JSON Lines files.")
+    parser.add_argument("group_ids", nargs="*", help="Group IDs to scrape")
+    parser.add_argument("--all", action="store_true", help="Scrape every group the user is a member of")
+    parser.add_argument("--out", default="scraped", help="Output directory (default: scraped)")
+    parser.add_argument("--format", dest="output_format", choices=sorted(WRITERS), default="csv", help="Output format (default: csv)")
+    parser.add_argument("--workers", type=int, default=4, help="Groups fetched at the same time")
+    parser.add_argument("--mine", action="store_true", help="Only keep the current user's messages")
+    parser.add_argument("--since", type=parse_date, default=None, help="Only keep messages after this date (YYYY-MM-DD)")
+    parser.add_argument("--requests-per-minute", type=float, default=None,
+                        help="Override the shared GroupMe request budget (only if your token allows more)")
+    parser.add_argument("--archive", metavar="DB", default=None,
+                        help="Also add scraped messages to this SQLite archive (e.g. data/archive.db)")
+    return parser
+
+def main() -> None:
+    args = build_parser().parse_args()
+    if not args.group_ids and not args.all:
+        build_parser().error("give group IDs or --all")
+    load_dotenv()
+
+    if args.requests_per_minute:
+        rate_limiter.global_bucket = TokenBucket(args.requests_per_minute, max(1, int(args.requests_per_minute // 6)))
+
+    scraper = GroupMeScraper()
+    try:
+        groups = scraper.list_groups()
+    except requests.exceptions.RequestException as e:
+        raise SystemExit(f"Error fetching groups: {e}")
+    names = {str(group.get('id')): group.get('name') for group in groups}
+    if not args.all:
+        groups = [{'id': group_id, 'name': names.get(group_id)} for group_id in args.group_ids]
+
+    only_user_id = None
+    if args.mine:
+        only_user_id = scraper.get_current_user().get('id')
+        if not only_user_id:
+            raise SystemExit("Could not determine the current user")
+
+    engine = ScrapeEngine(scraper, max_workers=args.workers, only_user_id=only_user_id, since=args.since,
+                          output_format=args.output_format, archive=MessageArchive(args.archive) if args.archive else None)
+    started = time.monotonic()
+    results = engine.scrape_groups(groups, args.out)
+    elapsed = time.monotonic() - started
+
+    pages = sum(result['pages'] for result in results)
+    written = sum(result['written'] for result in results)
+    failed = [result for result in results if result['error']]
+    print(f"\n📊 {len(results)} groups, {pages} pages, {written} messages in {elapsed:.1f}s "
+          f"({pages / elapsed * 60 if elapsed else 0:.0f} pages/min)")
+    for result in failed:
+        print(f"  ❌ {result['name']}: {result['error']}")
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\nGoodbye!")
@@ -1,96 +1,20 @@
+import json
 import random
 import os
 import asyncio
+import openai
 from dotenv import load_dotenv
 from openai import AsyncOpenAI
+import metrics
+from resilience import call_with_retry, get_breaker
 
 # Load environment variables
 load_dotenv()
 
-class MessageGenerator:
-    """
-    A simple message generator that uses LLMs to create messages.
-    """
-    
-    def __init__(self, api_key: str = None):
-        """
-        Initialize the message generator.
-        """
-        self.api_key = api_key or os.getenv('OPENAI_API_KEY')
-        if not self.api_key:
-            raise ValueError("OpenAI API key is required. Set OPENAI_API_KEY in .env or pass as parameter.")
-        
-        # Initialize OpenAI client
-        self.client = AsyncOpenAI(api_key=self.api_key)
-        
-        # Load phrases and message types
-        self.common_phrases = self._load_from_file("message_gen/common_phrases.txt")
-        self.message_types = self._load_from_file("message_gen/message_types.txt")
-    
-    def get_message_types(self) -> list:
-        """Get the message types."""
-        return self.message_types
-    
-    def _load_from_file(self, filename: str) -> list:
-        """Load items from a text file, one per line."""
-        if os.path.exists(filename):
-            with open(filename, 'r', encoding='utf-8') as f:
-                return [line.strip() for line in f if line.strip()]
-        else:
-            print(f"Warning: {filename} not found, using empty list")
-            return []
-    
-    async def generate_message(self, message_type: str = None, reply = False) -> str:
-        """Generate a message using GPT-5."""
-        
-        if not self.common_phrases:
-            raise ValueError("No common phrases found. Please add phrases to common_phrases.txt")
-        
-        # Pick random phrases and a message type
-        selected_phrases = random.sample(self.common_phrases, min(5, len(self.common_phrases)))
-        phrases_str = '\n'.join(selected_phrases)
-        if message_type is None:
-            message_type = random.choice(self.message_types) if self.message_types else "random thought"
-
-        stances_str = ''
-        if reply:
-            stances_str = f'''
-Here are some stances Keller has taken on various topics:
-If the message is about an event that isn't drinking related, you should instead tell people to get drunk.
-Keller thinks that Emiley is an evil dictator.
-Keller dislikes going to class and studying.
-Keller is a big fan of the IC Lawn and tailgates (which occur on the IC Lawn).
-Keller loves George
-Keller loves Natty Light, but hates any other form of alcohol besides Natty Light
-Keller dislikes swim practice, as he believes that drinking is the best way to swim faster.
-Kellerbot thinks it is the real Keller and will correct people who call him Kellerbot.
-Kellerbot is convinced he has been in the groupchat for the past four years and will disagree if someone welcomes him.
-'''
-
-        prompt = f'''
-Here are some phrases that Keller uses:
-{phrases_str}
-
-Here are some relevant locations and their contexts:
-IC Lawn - for tailgates and random drinking
-Curran - for parties
-Open Exec - to impeach Emiley
-A bush - when really drunk
-Nav Courtyard - when really drunk
-
-{stances_str}
-
-Here is a message type Keller would use:
-{message_type}
-
-Generate a message Keller would say, based on the message type. Only give the message — no explanations.
-'''
-        
-        try:
-            response = await self.client.responses.create(
-                model="gpt-5",  # You can also test with "gpt-5-mini"
-                instructions=
-                    f'''
+# Static system instructions, identical for every request so the provider can cache them
+# as a shared prompt prefix. Everything that varies per call, including the reply-only rules
+# and stances, goes into PROMPT_TEMPLATE.
+STYLE_RULES = '''
 General style rules:
 
 Keep messages under 3 sentences.
@@ -151,26 +75,287 @@ You’ll be given a set of relevant locations as well as context for these locat
 
 If you are telling someone to drink instead of going to class, do not always give a location, sometimes just tell them to drink.
 
-{"In this case, the message is a reply to another message. You will be given a list of stances Keller has taken on various topics. You should agree or disagree with the message based on the stance Keller has taken on the topic. If someone is nice to you and theres nothing to disagree with, be nice back." if reply else ''}
-''',
-                input=prompt,   
-                reasoning={ "effort": "low"}
+'''
+
+LOCATIONS = '''
+Here are some relevant locations and their contexts:
+IC Lawn - for tailgates and random drinking
+Curran - for parties
+Open Exec - to impeach Emiley
+A bush - when really drunk
+Nav Courtyard - when really drunk
+'''
+
+STANCES = '''
+Here are some stances Keller has taken on various topics:
+If the message is about an event that isn't drinking related, you should instead tell people to get drunk.
+Keller thinks that Emiley is an evil dictator.
+Keller dislikes going to class and studying.
+Keller is a big fan of the IC Lawn and tailgates (which occur on the IC Lawn).
+Keller loves George
+Keller loves Natty Light, but hates any other form of alcohol besides Natty Light
+Keller dislikes swim practice, as he believes that drinking is the best way to swim faster.
+Kellerbot thinks it is the real Keller and will correct people who call him Kellerbot.
+Kellerbot is convinced he has been in the groupchat for the past four years and will disagree if someone welcomes him.
+'''
+
+REPLY_RULES = "In this case, the message is a reply to another message. You will be given a list of stances Keller has taken on various topics. You should agree or disagree with the message based on the stance Keller has taken on the topic. If someone is nice to you and theres nothing to disagree with, be nice back."
+
+# Routes requests sharing SYSTEM_INSTRUCTIONS to the same prompt cache
+PROMPT_CACHE_KEY = "kellerbot-system-v2"
+
+SYSTEM_INSTRUCTIONS = STYLE_RULES + LOCATIONS
+
+PROMPT_TEMPLATE = '''{reply_rules}
+Here are some phrases that Keller uses:
+{phrases}
+
+{message_types}
+
+{task}
+'''
+
+# Only reply prompts carry these, after the shared prefix
+REPLY_RULES_BLOCK = '\n' + REPLY_RULES + '\n' + STANCES
+SINGLE_TYPE_TEMPLATE = "Here is a message type Keller would use:\n{message_type}"
+SINGLE_TASK = "Generate a message Keller would say, based on the message type. Only give the message — no explanations."
+SAME_TYPE_TASK_TEMPLATE = (
+    "Generate {count} different messages Keller would say, all based on the message type. "
+    "Each message must be distinct. Only give the messages — no explanations."
+)
+MULTI_TYPE_HEADER = "Here are the message types Keller would use, one per message:\n"
+MULTI_TASK_TEMPLATE = (
+    "Generate {count} different messages Keller would say, one for each numbered message type, in order. "
+    "Each message must be distinct. Only give the messages — no explanations."
+)
+
+# Errors worth retrying; anything else (bad request, auth) fails straight away
+RETRYABLE_OPENAI_ERRORS = (
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+class MessageGenerator:
+    """
+    A simple message generator that uses LLMs to create messages.
+    """
+    
+    def __init__(self, api_key: str = None):
+        """
+        Initialize the message generator.
+        """
+        self.api_key = api_key or os.getenv('OPENAI_API_KEY')
+        if not self.api_key:
+            raise ValueError("OpenAI API key is required. Set OPENAI_API_KEY in .env or pass as parameter.")
+        
+        # Initialize OpenAI client (retries are handled by call_with_retry, behind a circuit breaker)
+        self.client = AsyncOpenAI(api_key=self.api_key, max_retries=0)
+        
+        # Load phrases and message types
+        self.common_phrases = self._load_from_file("message_gen/common_phrases.txt")
+        self.message_types = self._load_from_file("message_gen/message_types.txt")
+        
+        # Prompt cache usage reported by the API, see get_prompt_cache_stats
+        self.prompt_cache_stats = {'requests': 0, 'cache_hits': 0, 'input_tokens': 0, 'cached_tokens': 0}
+    
+    def get_message_types(self) -> list:
+        """Get the message types."""
+        return self.message_types
+    
+    def _load_from_file(self, filename: str) -> list:
+        """Load items from a text file, one per line."""
+        if os.path.exists(filename):
+            with open(filename, 'r', encoding='utf-8') as f:
+                return [line.strip() for line in f if line.strip()]
+        else:
+            print(f"Warning: {filename} not found, using empty list")
+            return []
+    
+    def _build_prompt(self, message_types: list, reply: bool = False) -> str:
+        """Fill the prompt template with the per-call parts: reply rules, phrases and message types."""
+        # Pick random phrases
+        selected_phrases = random.sample(self.common_phrases, min(5, len(self.common_phrases)))
+
+        if len(set(message_types)) == 1:
+            # One shared type is stated once, however many variants are asked for
+            types_str = SINGLE_TYPE_TEMPLATE.format(message_type=message_types[0])
+            if len(message_types) == 1:
+                task_str = SINGLE_TASK
+            else:
+                task_str = SAME_TYPE_TASK_TEMPLATE.format(count=len(message_types))
+        else:
+            types_str = MULTI_TYPE_HEADER + '\n'.join(
+                f"{i}. {message_type}" for i, message_type in enumerate(message_types, 1)
             )
-            return response.output_text
+            task_str = MULTI_TASK_TEMPLATE.format(count=len(message_types))
+
+        return PROMPT_TEMPLATE.format(
+            reply_rules=REPLY_RULES_BLOCK if reply else '',
+            phrases='\n'.join(selected_phrases),
+            message_types=types_str,
+            task=task_str
+        )
+
+    def _pick_message_type(self) -> str:
+        """Pick a random message type."""
+        return random.choice(self.message_types) if self.message_types else "random thought"
+
+    async def _create_response(self, prompt: str, usage: dict = None, kind: str = "random", mode: str = "single", **kwargs):
+        """
+        Send one request to the model, with retries behind the OpenAI circuit breaker.
+        
+        If a usage dict is given, the response's total tokens are added to usage['tokens'].
+        kind ('random', 'reply' or 'introduction') and mode ('single' or 'batch') only label metrics.
+        """
+        with metrics.OPENAI_REQUEST_SECONDS.time(kind=kind, mode=mode):
+            try:
+                response = await call_with_retry(lambda: self.client.responses.create(
+                    model="gpt-5",  # You can also test with "gpt-5-mini"
+                    instructions=SYSTEM_INSTRUCTIONS,
+                    input=prompt,
+                    reasoning={ "effort": "low"},
+                    prompt_cache_key=PROMPT_CACHE_KEY,
+                    **kwargs
+                ), get_breaker("openai"), RETRYABLE_OPENAI_ERRORS)
+            except Exception as e:
+                metrics.OPENAI_REQUESTS.inc(kind=kind, mode=mode, result="error")
+                metrics.OPENAI_ERRORS.inc(kind=kind, error=type(e).__name__)
+                raise
+        metrics.OPENAI_REQUESTS.inc(kind=kind, mode=mode, result="ok")
+        self._record_token_metrics(response, kind)
+        self._record_prompt_cache_usage(response)
+        if usage is not None and getattr(response, 'usage', None) is not None:
+            usage['tokens'] = usage.get('tokens', 0) + (response.usage.total_tokens or 0)
+        return response
+
+    def _record_token_metrics(self, response, kind: str) -> None:
+        """Count a response's input, cached input and output tokens."""
+        usage = getattr(response, 'usage', None)
+        if usage is None:
+            return
+        details = getattr(usage, 'input_tokens_details', None)
+        metrics.OPENAI_TOKENS.inc(usage.input_tokens or 0, kind=kind, type="input")
+        metrics.OPENAI_TOKENS.inc(getattr(details, 'cached_tokens', 0) or 0, kind=kind, type="cached_input")
+        metrics.OPENAI_TOKENS.inc(usage.output_tokens or 0, kind=kind, type="output")
+
+    def _record_prompt_cache_usage(self, response) -> None:
+        """Track how much of each request's input was served from the provider's prompt cache."""
+        usage = getattr(response, 'usage', None)
+        if usage is None:
+            return
+        details = getattr(usage, 'input_tokens_details', None)
+        cached_tokens = getattr(details, 'cached_tokens', 0) or 0
+        self.prompt_cache_stats['requests'] += 1
+        self.prompt_cache_stats['input_tokens'] += usage.input_tokens or 0
+        self.prompt_cache_stats['cached_tokens'] += cached_tokens
+        if cached_tokens:
+            self.prompt_cache_stats['cache_hits'] += 1
+
+    def get_prompt_cache_stats(self) -> dict:
+        """Get prompt cache counters plus request and token hit rates."""
+        stats = dict(self.prompt_cache_stats)
+        stats['request_hit_rate'] = stats['cache_hits'] / stats['requests'] if stats['requests'] else 0.0
+        stats['token_hit_rate'] = stats['cached_tokens'] / stats['input_tokens'] if stats['input_tokens'] else 0.0
+        return stats
+
+    async def generate_message(self, message_type: str = None, reply = False, kind: str = "random") -> str:
+        """
+        Generate a message using GPT-5. kind labels the request in metrics.
         
-        except Exception as e:
-            print(f"Error generating message: {e}")
-            return random.choice(self.common_phrases)
+        Raises:
+            CircuitOpenError: If OpenAI is considered down
+            openai.OpenAIError: If the request fails after retries
+        """
+        
+        if not self.common_phrases:
+            raise ValueError("No common phrases found. Please add phrases to common_phrases.txt")
+        
+        if message_type is None:
+            message_type = self._pick_message_type()
+        prompt = self._build_prompt([message_type], reply)
+        
+        response = await self._create_response(prompt, kind=kind)
+        return response.output_text
+
+    async def generate_messages(self, count: int, message_type: str = None, reply = False, usage: dict = None, kind: str = "random") -> list:
+        """
+        Generate several candidate messages with a single GPT-5 request.
+        
+        Failures are raised, so callers can fall back to one request per candidate.
+        
+        Args:
+            count (int): Number of candidates to generate
+            message_type (str): Message type for every candidate. If None, a random type is picked per candidate.
+            reply (bool): Whether the candidates are replies
+            usage (dict): Optional token counter, see _create_response
+            kind (str): Message kind for metrics ('random', 'reply' or 'introduction')
+            
+        Returns:
+            list: Up to count generated messages; a short batch is topped up with one more request
+        """
+        if not self.common_phrases:
+            raise ValueError("No common phrases found. Please add phrases to common_phrases.txt")
+        
+        if message_type is None:
+            message_types = [self._pick_message_type() for _ in range(count)]
+        else:
+            message_types = [message_type] * count
+
+        messages = await self._request_messages(message_types, reply, usage, kind)
+        if not messages:
+            raise ValueError("Model returned no messages")
+        if len(messages) < count:
+            # Top up with one more request for the missing candidates
+            try:
+                messages += await self._request_messages(message_types[len(messages):], reply, usage, kind)
+            except Exception as e:
+                print(f"Error topping up generated messages: {e}")
+            if len(messages) < count:
+                print(f"Warning: model returned {len(messages)} of {count} requested messages")
+        return messages[:count]
+
+    async def _request_messages(self, message_types: list, reply: bool, usage: dict, kind: str) -> list:
+        """Request one message per message type in a single structured-output call."""
+        prompt = self._build_prompt(message_types, reply)
+        response = await self._create_response(
+            prompt,
+            usage=usage,
+            kind=kind,
+            mode="batch",
+            text={"format": {
+                "type": "json_schema",
+                "name": "keller_messages",
+                "strict": True,
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "messages": {"type": "array", "items": {"type": "string"}}
+                    },
+                    "required": ["messages"],
+                    "additionalProperties": False
+                }
+            }}
+        )
+        return [message.strip() for message in json.loads(response.output_text).get("messages", []) if message.strip()]
 
     async def generate_reply(self, original_message: str, username: str = None) -> str:
         """Generate a reply to an original message."""
         # Generate the actual reply content - no need to format with username/quote since GroupMe handles replies
-        reply_content = await self.generate_message(f"reply to this message: {original_message}", True)
+        reply_content = await self.generate_message(f"reply to this message: {original_message}", True, kind="reply")
         return reply_content
 
     async def generate_introduction(self, prompt: str) -> str:
         """Generate an introduction message based on a prompt."""
-        return await self.generate_message(f"introduction: {prompt}")
+        return await self.generate_message(f"introduction: {prompt}", kind="introduction")
+
+    async def generate_replies(self, original_message: str, count: int, username: str = None) -> list:
+        """Generate several reply candidates with a single request."""
+        return await self.generate_messages(count, f"reply to this message: {original_message}", True, kind="reply")
+
+    async def generate_introductions(self, prompt: str, count: int) -> list:
+        """Generate several introduction candidates with a single request."""
+        return await self.generate_messages(count, f"introduction: {prompt}", kind="introduction")
 
 if __name__ == "__main__":
     gen = MessageGenerator()
@@ -0,0 +1,188 @@
+"""
+Minimal Prometheus-style metrics, rendered in the text exposition format for /metrics.
+
+Metrics are plain in-process counters, gauges and histograms updated from the event loop.
+Label values should come from small fixed sets (message kinds, results), never free text.
+"""
+
+import math
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+# Seconds; suits HTTP round trips and short internal steps
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Seconds; model calls take several seconds and have long tails
+LLM_BUCKETS = (0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0, 120.0)
+
+def _format_value(value: float) -> str:
+    """Format a sample value the way Prometheus expects."""
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def _escape(value: str) -> str:
+    """Escape a label value."""
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    """Render a {name="value",...} label set, or nothing if there are no labels."""
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+class Metric(ABC):
+    """Base class: a named metric with a fixed list of label names."""
+
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        """
+        Create the metric and add it to the registry.
+
+        Args:
+            name (str): Metric name, e.g. kellerbot_polls_total
+            documentation (str): HELP text
+            labelnames (Sequence[str]): Names of the labels every sample must set
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        """Get the label values tuple for a sample, in labelnames order."""
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> List[str]:
+        """Get the sample lines for this metric."""
+
+    def render(self) -> str:
+        """Render the HELP and TYPE lines plus every sample."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+class Counter(Metric):
+    """A value that only goes up."""
+
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        """Add amount to the counter for the given labels."""
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        """Get the current value for the given labels."""
+        return self.values.get(self._key(labels), 0)
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in self.values.items()]
+
+class Gauge(Metric):
+    """A value that can go up and down, usually set right before rendering."""
+
+    metric_type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        """Set the gauge for the given labels."""
+        self.values[self._key(labels)] = value
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in self.values.items()]
+
+class Histogram(Metric):
+    """Counts observations into cumulative buckets, plus their sum and count."""
+
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self.counts: Dict[Tuple[str, ...], List[int]] = {}
+        self.sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        """Record one observation for the given labels."""
+        key = self._key(labels)
+        counts = self.counts.setdefault(key, [0] * len(self.buckets))
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        self.sums[key] = self.sums.get(key, 0) + value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the wall-clock duration of a with block, including when it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> List[str]:
+        lines = []
+        bucket_labelnames = self.labelnames + ("le",)
+        for key, counts in self.counts.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(bucket_labelnames, key + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(self.sums[key])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+# Every metric defined in the process, in definition order
+registry: List[Metric] = []
+
+def render() -> str:
+    """Render every registered metric in the Prometheus text format."""
+    return "\n".join(metric.render() for metric in registry) + "\n"
+
+# Polling and ingestion
+POLL_CYCLES = Counter("kellerbot_poll_cycles_total", "Polling cycles run, by result.", ["result"])
+POLL_CYCLE_SECONDS = Histogram("kellerbot_poll_cycle_seconds", "Duration of one polling cycle.")
+MESSAGES_INGESTED = Counter("kellerbot_messages_ingested_total", "Group messages fed into the reply pipeline, by source.", ["source"])
+DUPLICATE_MESSAGES = Counter("kellerbot_duplicate_messages_total", "Group messages skipped because another source already ingested them.", ["source"])
+REPLY_DECISIONS = Counter("kellerbot_reply_decisions_total", "Reply dice rolls, by outcome.", ["outcome"])
+
+# Generation
+OPENAI_REQUESTS = Counter("kellerbot_openai_requests_total", "OpenAI requests, by message kind, mode and result.", ["kind", "mode", "result"])
+OPENAI_REQUEST_SECONDS = Histogram("kellerbot_openai_request_seconds", "OpenAI request latency including retries.", ["kind", "mode"], LLM_BUCKETS)
+OPENAI_TOKENS = Counter("kellerbot_openai_tokens_total", "OpenAI tokens used, by message kind and token type.", ["kind", "type"])
+OPENAI_ERRORS = Counter("kellerbot_openai_errors_total", "Failed OpenAI requests, by message kind and error class.", ["kind", "error"])
+CANDIDATES = Counter("kellerbot_candidates_total", "Message candidates produced, by message type and result.", ["message_type", "result"])
+GENERATION_SECONDS = Histogram("kellerbot_generation_seconds", "Time to fill one message with candidates.", ["message_type"], LLM_BUCKETS)
+GENERATION_JOBS = Counter("kellerbot_generation_jobs_total", "Generation scheduler jobs, by priority and outcome.", ["priority", "outcome"])
+GENERATION_QUEUE_WAIT_SECONDS = Histogram("kellerbot_generation_queue_wait_seconds", "Time jobs spent queued before running.", ["priority"])
+
+# Sending
+SENDS = Counter("kellerbot_sends_total", "Messages sent to GroupMe, by result.", ["result"])
+SEND_SECONDS = Histogram("kellerbot_send_seconds", "GroupMe send latency.")
+
+# Point-in-time values, refreshed by BotController.render_metrics
+GENERATION_QUEUE_DEPTH = Gauge("kellerbot_generation_queue_depth", "Generation jobs waiting, by priority.", ["priority"])
+GENERATION_JOBS_RUNNING = Gauge("kellerbot_generation_jobs_running", "Generation jobs currently running.")
+MESSAGES = Gauge("kellerbot_messages", "Tracked messages, by state.", ["state"])
+WARM_POOL_READY = Gauge("kellerbot_warm_pool_ready", "Pre-generated random messages ready to serve.")
+PROMPT_CACHE_HIT_RATIO = Gauge("kellerbot_prompt_cache_hit_ratio", "Share of OpenAI input tokens served from the prompt cache.")
+POLLING_INTERVAL_SECONDS = Gauge("kellerbot_polling_interval_seconds", "Current adaptive polling interval.")
+CIRCUIT_OPEN = Gauge("kellerbot_circuit_open", "1 if a dependency's circuit breaker is open or half open.", ["dependency"])
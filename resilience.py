@@ -0,0 +1,143 @@
+"""
+Retry and circuit breaker helpers shared by the GroupMe and OpenAI clients.
+"""
+
+import time
+import random
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Tuple, Type, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit breaker is open."""
+
+class CircuitBreaker:
+    """
+    Tracks consecutive failures of one dependency.
+
+    After failure_threshold failures in a row the circuit opens and calls fail fast for
+    reset_timeout seconds. Then a single trial call is let through (half open); success
+    closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Initialize the circuit breaker.
+
+        Args:
+            name (str): Dependency name, for logging
+            failure_threshold (int): Consecutive failures before opening
+            reset_timeout (float): Seconds to stay open before allowing a trial call
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        """Get the current state: 'closed', 'open' or 'half_open'."""
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def before_call(self) -> None:
+        """
+        Check whether a call may go through.
+
+        Raises:
+            CircuitOpenError: If the circuit is open, or half open with a trial call already running
+        """
+        state = self.state
+        if state == "open" or (state == "half_open" and self.trial_in_flight):
+            raise CircuitOpenError(f"{self.name} circuit is open - failing fast")
+        if state == "half_open":
+            self.trial_in_flight = True
+
+    def record_success(self) -> None:
+        """Record a successful call, closing the circuit."""
+        if self.opened_at is not None:
+            logger.info(f"🟢 {self.name} circuit closed")
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def record_failure(self) -> None:
+        """Record a failed call, opening the circuit once the threshold is hit."""
+        self.failures += 1
+        self.trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                logger.warning(f"🔴 {self.name} circuit opened after {self.failures} consecutive failures")
+            self.opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """Release a trial call that ended with a non-retryable error (neither success nor outage)."""
+        self.trial_in_flight = False
+
+# One breaker per dependency, shared by every client in the process
+breakers: Dict[str, CircuitBreaker] = {}
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Get the shared circuit breaker for a dependency, creating it on first use."""
+    if name not in breakers:
+        breakers[name] = CircuitBreaker(name)
+    return breakers[name]
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """Exponential backoff with full jitter for the given (1-based) retry attempt."""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** (attempt - 1))))
+
+async def call_with_retry(
+    func: Callable[[], Awaitable[T]],
+    breaker: CircuitBreaker,
+    retry_on: Tuple[Type[BaseException], ...],
+    attempts: int = 3,
+    base_delay: float = 0.25,
+    max_delay: float = 4.0,
+) -> T:
+    """
+    Call an async function with bounded retries behind a circuit breaker.
+
+    Only exceptions in retry_on are retried and counted as dependency failures; anything
+    else propagates immediately.
+
+    Args:
+        func (Callable): Zero-argument coroutine function making the call
+        breaker (CircuitBreaker): Breaker for the dependency being called
+        retry_on (Tuple): Exception types that indicate a transient failure
+        attempts (int): Maximum number of calls, including the first
+        base_delay (float): Backoff before the first retry, doubled each time
+        max_delay (float): Upper bound on a single backoff
+
+    Returns:
+        The function's result
+
+    Raises:
+        CircuitOpenError: If the breaker is open
+    """
+    for attempt in range(1, attempts + 1):
+        breaker.before_call()
+        try:
+            result = await func()
+        except retry_on as e:
+            breaker.record_failure()
+            if attempt == attempts or breaker.state == "open":
+                raise
+            delay = backoff_delay(attempt, base_delay, max_delay)
+            logger.warning(f"🔁 {breaker.name} call failed ({e}), retry {attempt}/{attempts - 1} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+        except BaseException:
+            breaker.release()
+            raise
+        else:
+            breaker.record_success()
+            return result
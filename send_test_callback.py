@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for GroupMe's bot callback - POSTs a fake chat message to a running KellerBot server.
+"""
+
+import sys
+import time
+import argparse
+import requests
+from env import BOT_GROUP_ID, GROUPME_CALLBACK_TOKEN
+
+def build_payload(text: str, name: str, user_id: str, group_id: str) -> dict:
+    """Build a payload shaped like the ones GroupMe sends to bot callback URLs."""
+    now = time.time()
+    return {
+        'attachments': [],
+        'avatar_url': None,
+        'created_at': int(now),
+        'group_id': group_id,
+        'id': str(int(now * 1000000)),
+        'name': name,
+        'sender_id': user_id,
+        'sender_type': 'user',
+        'source_guid': str(int(now * 1000)),
+        'system': False,
+        'text': text,
+        'user_id': user_id
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Send a fake GroupMe callback to KellerBot")
+    parser.add_argument('text', help="Message text")
+    parser.add_argument('--name', default="Test User", help="Sender display name")
+    parser.add_argument('--user-id', default="0", help="Sender user ID")
+    parser.add_argument('--group-id', default=BOT_GROUP_ID, help="Group ID (defaults to BOT_GROUP_ID)")
+    parser.add_argument('--url', default="http://localhost:8080/api/groupme/callback", help="Callback URL")
+    args = parser.parse_args()
+
+    params = {'token': GROUPME_CALLBACK_TOKEN} if GROUPME_CALLBACK_TOKEN else None
+    payload = build_payload(args.text, args.name, args.user_id, args.group_id)
+
+    try:
+        response = requests.post(args.url, json=payload, params=params)
+        print(f"{response.status_code}: {response.text}")
+    except requests.exceptions.RequestException as e:
+        print(f"Error sending callback: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,21 @@
 import time
 import asyncio
+import secrets
 import logging
+from collections import OrderedDict
 from datetime import datetime
 from typing import List, Dict
-from groupme.groupme_interface import GroupMeInterface
+from env import GROUPME_CALLBACK_TOKEN
+from groupme.async_groupme_interface import AsyncGroupMeInterface
 from server.message_manager import MessageManager
+from server.message_archive import MessageArchive
+from server.polling_scheduler import PollingScheduler
+from server.generation_scheduler import (
+    GenerationScheduler, PRIORITY_KELLER_REPLY, PRIORITY_REPLY, PRIORITY_RANDOM, PRIORITY_MANUAL, PRIORITY_WARM_POOL
+)
+from server.warm_pool import WarmPool
+from resilience import breakers
+import metrics
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -12,11 +23,20 @@ logger = logging.getLogger(__name__)
 class BotController:
     """Controls the bot's behavior and GroupMe interaction."""
     
-    def __init__(self, bot_group_id: str = None):
-        self.groupme_interface = GroupMeInterface(bot_group_id)
-        self.message_manager = MessageManager()
+    def __init__(self, bot_group_id: str = None, config_path: str = "server/config.json", callback_token: str = None):
+        self.groupme_interface = AsyncGroupMeInterface(bot_group_id)
+        self.message_manager = MessageManager(config_path)
+        self.callback_token = callback_token or GROUPME_CALLBACK_TOKEN
+        self._check_ingestion_mode(self.message_manager.config.get("ingestion_mode", "polling"))
+        self.polling_scheduler = PollingScheduler(self.message_manager.config)
+        self.generation_scheduler = GenerationScheduler(self.message_manager.config)
+        self.warm_pool = WarmPool(self.message_manager)
         self.running = False
         self.polling_task = None
+        self.seen_message_ids = OrderedDict()  # Recently ingested GroupMe message IDs, for dedupe
+        self.max_seen_message_ids = 1000
+        archive_path = self.message_manager.config.get("message_archive_path")
+        self.archive = MessageArchive(archive_path) if archive_path else None
         
         # Set bot server if provided
         if bot_group_id:
@@ -35,6 +55,7 @@ class BotController:
         logger.info("🚀 Starting bot polling...")
         self.running = True
         self.polling_task = asyncio.create_task(self._polling_loop())
+        self.message_manager.start_sweeper()
         logger.info("✅ Bot polling started successfully")
     
     async def stop_polling(self):
@@ -51,13 +72,27 @@ class BotController:
                 await self.polling_task
             except asyncio.CancelledError:
                 pass
+        await self.generation_scheduler.stop()
+        await self.message_manager.stop_sweeper()
+        await self.groupme_interface.close()
         logger.info("✅ Bot polling stopped successfully")
     
+    async def close(self):
+        """Stop polling if needed and release resources, flushing the message store."""
+        if self.running:
+            await self.stop_polling()
+        await self.generation_scheduler.stop()
+        await self.groupme_interface.close()
+        await self.message_manager.close()
+        if self.archive is not None:
+            self.archive.close()
+    
     async def _polling_loop(self):
-        """Main async polling loop that runs at configurable intervals."""
+        """Main async polling loop, paced by the adaptive polling scheduler."""
         last_polling_interval = None
         initial_polling_interval = self.message_manager.config.get("polling_interval_seconds", 120)
-        logger.info(f"🔄 Polling loop started - running every {initial_polling_interval} seconds ({initial_polling_interval/60:.1f} minutes)")
+        logger.info(f"🔄 Polling loop started - base interval {initial_polling_interval} seconds ({initial_polling_interval/60:.1f} minutes)")
+        last_cycle_time = None
         while self.running:
             try:
                 # Get current polling interval from config
@@ -69,45 +104,154 @@ class BotController:
                     last_polling_interval = polling_interval
                 
                 # Process one polling cycle
-                await self._process_polling_cycle()
+                now = time.monotonic()
+                elapsed = now - last_cycle_time if last_cycle_time is not None else polling_interval
+                last_cycle_time = now
+                with metrics.POLL_CYCLE_SECONDS.time():
+                    new_message_count = await self._process_polling_cycle(elapsed)
+                metrics.POLL_CYCLES.inc(result="ok")
                 
-                # Wait for the configured interval
-                logger.debug(f"⏰ Waiting {polling_interval} seconds until next polling cycle...")
-                await asyncio.sleep(polling_interval)
+                # Wait for the adaptive interval
+                delay = self.polling_scheduler.record_success(new_message_count)
+                logger.debug(f"⏰ Waiting {delay:.1f} seconds until next polling cycle...")
+                await asyncio.sleep(delay)
                 
             except asyncio.CancelledError:
                 logger.info("🛑 Polling loop cancelled")
                 break
             except Exception as e:
                 logger.error(f"💥 Error in polling loop: {e}")
-                logger.info("⏰ Waiting 1 minute before retrying...")
-                await asyncio.sleep(60)  # Wait 1 minute on error
+                metrics.POLL_CYCLES.inc(result="error")
+                delay = self.polling_scheduler.record_error()
+                logger.info(f"⏰ Waiting {delay:.1f} seconds before retrying ({self.polling_scheduler.consecutive_errors} consecutive errors)...")
+                await asyncio.sleep(delay)
     
-    async def _process_polling_cycle(self):
-        """Process one polling cycle."""
-        try:
-            logger.info("🔄 Starting polling cycle...")
+    async def _process_polling_cycle(self, elapsed_seconds: float = None) -> int:
+        """
+        Process one polling cycle.
+        
+        Args:
+            elapsed_seconds (float): Seconds since the previous cycle, used to scale the random message chance
             
-            # Get new messages from GroupMe
-            new_messages = self.groupme_interface.poll_new_messages()
+        Returns:
+            int: Number of new messages found
+        """
+        logger.info("🔄 Starting polling cycle...")
+        
+        new_messages = []
+        if self.message_manager.config.get("ingestion_mode", "polling") == "webhook":
+            # Messages arrive through the callback endpoint; drop the cursor so switching
+            # back to polling re-seeds it instead of replaying everything missed meanwhile
+            self.groupme_interface.last_message_id = None
+        else:
+            # Get new messages from GroupMe (errors propagate so the scheduler can back off)
+            new_messages = await self.groupme_interface.poll_new_messages()
             logger.info(f"📨 Found {len(new_messages)} new messages from GroupMe")
-            
-            # Process each new message
-            for msg in new_messages:
-                await self._process_incoming_message(msg)
-            
-            # Check if we should send a random message
-            if self.message_manager.should_send_random_message():
-                logger.info("🎲 Random message generation triggered - starting async generation")
-                # Create task for async generation
-                asyncio.create_task(self.message_manager.generate_random_message())
+            await self._archive_messages(new_messages, "poll")
+        
+        # Process each new message
+        for msg in new_messages:
+            await self.ingest_message(msg, "poll")
+        
+        # Check if we should send a random message
+        if self.message_manager.should_send_random_message(elapsed_seconds):
+            pooled = self.warm_pool.take()
+            if pooled is not None:
+                self.message_manager.add_random_message(pooled)
             else:
-                logger.debug(f"⏸️ Random message generation skipped - probability check failed")
+                logger.info("🎲 Random message generation triggered - warm pool empty, queueing generation")
+                self.generation_scheduler.submit(
+                    PRIORITY_RANDOM, self.message_manager.generate_random_message, "random message"
+                )
+        else:
+            logger.debug(f"⏸️ Random message generation skipped - probability check failed")
+        
+        # Top up the warm pool only while nothing else needs the generation queue
+        self._refill_warm_pool()
+        
+        logger.info("✅ Polling cycle completed")
+        return len(new_messages)
+    
+    def _refill_warm_pool(self):
+        """Queue one warm pool refill if the generation queue is idle."""
+        if not self.generation_scheduler.is_idle():
+            return
+        message_type = self.warm_pool.next_refill_type()
+        if message_type is None:
+            return
+        self.generation_scheduler.submit(
+            PRIORITY_WARM_POOL, lambda: self.warm_pool.refill(message_type), "warm pool refill"
+        )
+    
+    def _mark_seen(self, message_id: str) -> bool:
+        """Remember a message ID. Returns False if it was already ingested."""
+        if message_id in self.seen_message_ids:
+            return False
+        self.seen_message_ids[message_id] = True
+        while len(self.seen_message_ids) > self.max_seen_message_ids:
+            self.seen_message_ids.popitem(last=False)
+        return True
+    
+    async def ingest_message(self, message_data: Dict, source: str) -> bool:
+        """
+        Feed a message into the reply pipeline, skipping ones already ingested by another source.
+        
+        Args:
+            message_data (Dict): Message in the format returned by poll_new_messages
+            source (str): Where the message came from ('poll' or 'webhook'), for logging
             
-            logger.info("✅ Polling cycle completed")
-                
+        Returns:
+            bool: True if the message was processed, False if it was a duplicate
+        """
+        message_id = message_data.get('id')
+        if message_id and not self._mark_seen(message_id):
+            logger.debug(f"🔁 Skipping duplicate message {message_id} from {source}")
+            metrics.DUPLICATE_MESSAGES.inc(source=source)
+            return False
+        metrics.MESSAGES_INGESTED.inc(source=source)
+        await self._process_incoming_message(message_data)
+        return True
+    
+    def _check_ingestion_mode(self, mode: str):
+        """Refuse callback ingestion without a token, since anyone could post forged messages."""
+        if mode != "polling" and not self.callback_token:
+            raise ValueError(f"Ingestion mode '{mode}' needs GROUPME_CALLBACK_TOKEN to be set")
+    
+    def verify_callback_token(self, token: str) -> bool:
+        """Check the token a callback POST carries against GROUPME_CALLBACK_TOKEN."""
+        if not self.callback_token:
+            # Only possible in polling mode, where callbacks are ignored anyway
+            return self.message_manager.config.get("ingestion_mode", "polling") == "polling"
+        return token is not None and secrets.compare_digest(token, self.callback_token)
+    
+    async def handle_callback(self, payload: Dict) -> bool:
+        """
+        Handle a GroupMe bot callback POST.
+        
+        Args:
+            payload (Dict): Callback JSON body
+            
+        Returns:
+            bool: True if the message was ingested
+        """
+        if self.message_manager.config.get("ingestion_mode", "polling") == "polling":
+            logger.debug("📭 Ignoring callback - ingestion mode is polling")
+            return False
+        message_data = await self.groupme_interface.parse_callback_message(payload)
+        if message_data is None:
+            return False
+        logger.info(f"📬 Received message {message_data['id']} via callback")
+        await self._archive_messages([message_data], "webhook")
+        return await self.ingest_message(message_data, "webhook")
+    
+    async def _archive_messages(self, messages: List[Dict], source: str):
+        """Add incoming messages to the history archive off the event loop. Failures are logged, never raised."""
+        if self.archive is None or not messages:
+            return
+        try:
+            await asyncio.to_thread(self.archive.add_polled_messages, messages, source)
         except Exception as e:
-            logger.error(f"💥 Error processing polling cycle: {e}")
+            logger.error(f"💥 Error archiving messages: {e}")
     
     async def _process_incoming_message(self, message_data: Dict):
         """Process an incoming message and potentially generate a reply."""
@@ -120,13 +264,20 @@ class BotController:
             logger.info(f"💭 Processing incoming message {reply_to_id} with {likes} likes")
             logger.info(f"  📝 Text: {original_text[:100]}...")
             
-            # Generate reply message if probability allows
-            # Create task for async generation
-            logger.info(f"🎯 Starting async reply generation for message {reply_to_id}")
+            # Roll the reply dice up front so only messages we'll answer use the queue
+            decision = self.message_manager.decide_reply(reply_to_id, original_text, likes)
+            if not decision['reply']:
+                return
+            
+            # Queue for async generation, replies mentioning Keller first
+            logger.info(f"🎯 Queueing reply generation for message {reply_to_id}")
             username = message_data.get('username', 'Unknown')
-            asyncio.create_task(self.message_manager.generate_reply_message(
-                reply_to_id, original_text, likes, username
-            ))
+            priority = PRIORITY_KELLER_REPLY if decision['mentions_keller'] else PRIORITY_REPLY
+            self.generation_scheduler.submit(
+                priority,
+                lambda: self.message_manager.generate_reply_message(reply_to_id, original_text, likes, username),
+                f"reply to {reply_to_id}"
+            )
             
         except Exception as e:
             logger.error(f"💥 Error processing incoming message: {e}")
@@ -137,33 +288,37 @@ class BotController:
             message_obj = self.message_manager.get_message_by_id(message_id)
             if not message_obj or not message_obj.selected_message:
                 logger.warning(f"⚠️ Cannot send message {message_id} - no message object or selected message")
+                metrics.SENDS.inc(result="rejected")
                 return False
             
             logger.info(f"📤 Sending message {message_id} to GroupMe")
             logger.info(f"  📝 Content: {message_obj.selected_message[:100]}...")
             
             # Send the message
-            if message_obj.reply_to_id:
-                # Send as reply with proper GroupMe reply attachment
-                logger.info(f"  🔄 Sending as reply to message {message_obj.reply_to_id}")
-                response = self.groupme_interface.send_message(
-                    message_obj.selected_message, 
-                    message_obj.reply_to_id
-                )
-            else:
-                # Send as regular message
-                logger.info(f"  📨 Sending as regular message")
-                response = self.groupme_interface.send_message(
-                    message_obj.selected_message
-                )
+            with metrics.SEND_SECONDS.time():
+                if message_obj.reply_to_id:
+                    # Send as reply with proper GroupMe reply attachment
+                    logger.info(f"  🔄 Sending as reply to message {message_obj.reply_to_id}")
+                    response = await self.groupme_interface.send_message(
+                        message_obj.selected_message, 
+                        message_obj.reply_to_id
+                    )
+                else:
+                    # Send as regular message
+                    logger.info(f"  📨 Sending as regular message")
+                    response = await self.groupme_interface.send_message(
+                        message_obj.selected_message
+                    )
             
             # Mark as sent
             self.message_manager.mark_message_sent(message_id)
+            metrics.SENDS.inc(result="ok")
             logger.info(f"✅ Message {message_id} sent successfully")
             return True
             
         except Exception as e:
             logger.error(f"💥 Error sending message {message_id}: {e}")
+            metrics.SENDS.inc(result="failed")
             return False
     
     async def get_pending_messages(self) -> List[Dict]:
@@ -171,39 +326,111 @@ class BotController:
         pending = self.message_manager.get_pending_messages()
         return [msg.to_dict() for msg in pending]
     
+    def get_messages_cursor(self) -> str:
+        """Get the version cursor of the pending messages, usable as an ETag."""
+        return self.message_manager.get_version_cursor()
+    
+    async def get_message_changes(self, cursor: str = None) -> Dict:
+        """Get the messages changed since a cursor (see MessageManager.get_changes)."""
+        return self.message_manager.get_changes(cursor)
+    
+    async def get_message_history(self, after_id: str = None, since: datetime = None, until: datetime = None, limit: int = 50) -> Dict:
+        """Get a page of message history plus the cursor for the next page."""
+        messages = await self.message_manager.list_messages(after_id, since, until, limit)
+        return {
+            'messages': messages,
+            'next_cursor': messages[-1]['id'] if len(messages) == limit else None
+        }
+    
+    async def search_archive(self, **filters) -> List[Dict]:
+        """
+        Search archived chat history (see MessageArchive.search for the filters).
+        
+        Raises:
+            ValueError: If the archive is disabled or the filters are invalid
+        """
+        if self.archive is None:
+            raise ValueError("Message archive is disabled (message_archive_path is not set)")
+        return await asyncio.to_thread(self.archive.search, **filters)
+    
+    async def get_archive_stats(self) -> Dict:
+        """Get archive totals, or {'enabled': False} if the archive is disabled."""
+        if self.archive is None:
+            return {'enabled': False}
+        return {'enabled': True, **await asyncio.to_thread(self.archive.get_stats)}
+    
+    async def get_reply_decisions(self) -> List[Dict]:
+        """Get recent reply dice decisions, newest first."""
+        return list(reversed(self.message_manager.reply_decisions))
+    
+    def subscribe_events(self) -> asyncio.Queue:
+        """Subscribe to message events for the dashboard push channel."""
+        return self.message_manager.subscribe()
+    
+    def unsubscribe_events(self, queue: asyncio.Queue):
+        """Unsubscribe a queue returned by subscribe_events."""
+        self.message_manager.unsubscribe(queue)
+    
     async def get_config(self) -> Dict:
         """Get current configuration."""
         return self.message_manager.config.copy()
     
     async def update_config(self, new_config: Dict):
         """Update configuration."""
+        if 'ingestion_mode' in new_config:
+            self._check_ingestion_mode(new_config['ingestion_mode'])
         self.message_manager.update_config(new_config)
     
+    async def _run_manual_generation(self, factory, label: str) -> Dict:
+        """Queue a dashboard-triggered generation and wait for its result."""
+        future = self.generation_scheduler.submit(PRIORITY_MANUAL, factory, label)
+        if future is None:
+            raise ValueError("Generation queue is full, try again later")
+        try:
+            # Shielded, so cancelling this caller leaves the job's future alone and the two can be told apart
+            message_obj = await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if not future.cancelled():
+                raise  # The caller itself was cancelled
+            raise ValueError("Generation was dropped to make room for replies, try again later")
+        return message_obj.to_dict()
+    
     async def generate_introduction(self) -> Dict:
         """Generate an introduction message asynchronously."""
-        message_obj = await self.message_manager.generate_introduction_message()
-        return message_obj.to_dict()
+        return await self._run_manual_generation(self.message_manager.generate_introduction_message, "introduction")
     
     async def generate_test_message(self) -> Dict:
         """Generate a test message asynchronously."""
-        message_obj = await self.message_manager.generate_manual_message()
-        return message_obj.to_dict()
+        return await self._run_manual_generation(self.message_manager.generate_manual_message, "test message")
     
     async def select_message_option(self, message_id: str, option_index: int) -> bool:
         """Select a specific message option."""
-        message_obj = self.message_manager.get_message_by_id(message_id)
-        if message_obj:
-            return message_obj.select_message(option_index)
-        return False
+        return self.message_manager.select_message_option(message_id, option_index)
     
     async def delete_message(self, message_id: str):
         """Delete a message."""
         self.message_manager.delete_message(message_id)
     
+    def render_metrics(self) -> str:
+        """Refresh the point-in-time gauges and render all metrics in the Prometheus text format."""
+        queue_stats = self.generation_scheduler.get_stats()
+        for priority, depth in queue_stats['queued_by_priority'].items():
+            metrics.GENERATION_QUEUE_DEPTH.set(depth, priority=priority)
+        metrics.GENERATION_JOBS_RUNNING.set(queue_stats['running'])
+        for state, count in self.message_manager.get_message_counts().items():
+            metrics.MESSAGES.set(count, state=state)
+        metrics.WARM_POOL_READY.set(self.warm_pool.get_stats()['ready'])
+        metrics.PROMPT_CACHE_HIT_RATIO.set(self.message_manager.message_generator.get_prompt_cache_stats()['token_hit_rate'])
+        if self.polling_scheduler.current_interval is not None:
+            metrics.POLLING_INTERVAL_SECONDS.set(self.polling_scheduler.current_interval)
+        for name, breaker in breakers.items():
+            metrics.CIRCUIT_OPEN.set(0 if breaker.state == "closed" else 1, dependency=name)
+        return metrics.render()
+    
     async def get_bot_status(self) -> Dict:
         """Get bot status information."""
         try:
-            bot_info = self.groupme_interface.get_bot_server_info()
+            bot_info = await self.groupme_interface.get_cached_bot_server_info()
             
             # Calculate current probability for random message generation
             polling_interval = self.message_manager.config.get("polling_interval_seconds", 120)  # Default to 120 seconds (2 minutes)
@@ -218,9 +445,15 @@ class BotController:
                 'messages_per_day': self.message_manager.messages_per_day,
                 'target_messages_per_day': target_messages,
                 'polling_interval_seconds': polling_interval,
+                'current_polling_interval_seconds': self.polling_scheduler.current_interval,
+                'ingestion_mode': self.message_manager.config.get("ingestion_mode", "polling"),
                 'probability_per_cycle': round(probability_per_cycle, 4),
-                'pending_messages': len(self.message_manager.get_pending_messages()),
-                'generating_messages': self.message_manager.get_generating_messages_count()
+                'pending_messages': self.message_manager.get_pending_messages_count(),
+                'generating_messages': self.message_manager.get_generating_messages_count(),
+                'message_counts': self.message_manager.get_message_counts(),
+                'generation_queue': self.generation_scheduler.get_stats(),
+                'prompt_cache': self.message_manager.message_generator.get_prompt_cache_stats(),
+                'warm_pool': self.warm_pool.get_stats()
             }
         except Exception as e:
             return {
@@ -0,0 +1,196 @@
+import time
+import heapq
+import asyncio
+import itertools
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional
+import metrics
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Lower number runs first
+PRIORITY_KELLER_REPLY = 0
+PRIORITY_REPLY = 1
+PRIORITY_RANDOM = 2
+PRIORITY_MANUAL = 3
+PRIORITY_WARM_POOL = 4  # Background refills, first to be shed
+
+PRIORITY_NAMES = {
+    PRIORITY_KELLER_REPLY: "keller_reply",
+    PRIORITY_REPLY: "reply",
+    PRIORITY_RANDOM: "random",
+    PRIORITY_MANUAL: "manual",
+    PRIORITY_WARM_POOL: "warm_pool",
+}
+
+class GenerationJob:
+    """A queued generation request."""
+
+    def __init__(self, priority: int, seq: int, factory: Callable[[], Awaitable], label: str):
+        self.priority = priority
+        self.seq = seq
+        self.factory = factory
+        self.label = label
+        self.enqueued_at = time.monotonic()
+        self.future = asyncio.get_running_loop().create_future()
+
+    def __lt__(self, other: "GenerationJob") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+class GenerationScheduler:
+    """
+    Runs message generation jobs with a global concurrency limit and a bounded priority queue.
+
+    When the queue is full a new job evicts the least important queued job if it outranks it,
+    otherwise the new job is dropped. Jobs that waited longer than the configured max age are
+    shed when they reach the front of the queue, except manual jobs, which have a caller waiting.
+    """
+
+    def __init__(self, config: Dict):
+        """
+        Initialize the scheduler.
+
+        Args:
+            config (Dict): Live config dict (shared with MessageManager)
+        """
+        self.config = config
+        self.queue: List[GenerationJob] = []
+        self.seq = itertools.count()
+        self.workers: List[asyncio.Task] = []
+        self.available: Optional[asyncio.Semaphore] = None  # Counts queued jobs
+        self.running_jobs = 0
+        self.completed_jobs = 0
+        self.dropped_jobs = 0
+        self.failed_jobs = 0
+
+    @property
+    def concurrency(self) -> int:
+        return max(1, self.config.get("generation_concurrency", 2))
+
+    @property
+    def max_queue_size(self) -> int:
+        return max(1, self.config.get("generation_queue_size", 20))
+
+    @property
+    def max_queue_age(self) -> float:
+        return self.config.get("generation_max_queue_age_seconds", 300)
+
+    def _ensure_workers(self) -> None:
+        """Start worker tasks on the running loop if they aren't running yet."""
+        if self.available is None:
+            self.available = asyncio.Semaphore(len(self.queue))
+        self.workers = [worker for worker in self.workers if not worker.done()]
+        while len(self.workers) < self.concurrency:
+            self.workers.append(asyncio.create_task(self._worker()))
+
+    def submit(self, priority: int, factory: Callable[[], Awaitable], label: str) -> Optional[asyncio.Future]:
+        """
+        Queue a generation job. Must be called from the event loop.
+
+        Args:
+            priority (int): One of the PRIORITY_* constants
+            factory (Callable): Zero-argument function returning the generation coroutine
+            label (str): Description for logging
+
+        Returns:
+            asyncio.Future: Resolves to the job's result, or None if the job was dropped
+        """
+        self._ensure_workers()
+        job = GenerationJob(priority, next(self.seq), factory, label)
+        # Background jobs have nobody awaiting them, so mark failures as retrieved
+        job.future.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+        if len(self.queue) >= self.max_queue_size:
+            worst = max(self.queue)
+            if worst.priority <= job.priority:
+                self._drop(job, "queue full")
+                return None
+            # Swap the least important queued job for this one, queued count is unchanged
+            self.queue.remove(worst)
+            heapq.heapify(self.queue)
+            self._drop(worst, "evicted by higher priority work")
+        else:
+            self.available.release()
+
+        heapq.heappush(self.queue, job)
+        logger.info(f"📥 Queued {label} ({PRIORITY_NAMES.get(priority, priority)}) - {len(self.queue)} queued, {self.running_jobs} running")
+        return job.future
+
+    def _drop(self, job: GenerationJob, reason: str) -> None:
+        """Drop a job and cancel its future."""
+        self.dropped_jobs += 1
+        metrics.GENERATION_JOBS.inc(priority=PRIORITY_NAMES.get(job.priority, str(job.priority)), outcome="dropped")
+        job.future.cancel()
+        logger.warning(f"🗑️ Dropped {job.label} - {reason}")
+
+    def _retire_if_surplus(self) -> bool:
+        """Retire the calling worker if generation_concurrency was lowered below the worker count."""
+        if len(self.workers) <= self.concurrency:
+            return False
+        self.workers.remove(asyncio.current_task())
+        return True
+
+    async def _worker(self) -> None:
+        """Pull jobs off the queue and run them, one at a time, until retired."""
+        while not self._retire_if_surplus():
+            await self.available.acquire()
+            if self._retire_if_surplus():
+                # Hand the job to a worker that is staying
+                self.available.release()
+                return
+            job = heapq.heappop(self.queue)
+
+            age = time.monotonic() - job.enqueued_at
+            priority_name = PRIORITY_NAMES.get(job.priority, str(job.priority))
+            if job.priority != PRIORITY_MANUAL and age > self.max_queue_age:
+                self._drop(job, f"stale after {age:.0f}s in queue")
+                continue
+            metrics.GENERATION_QUEUE_WAIT_SECONDS.observe(age, priority=priority_name)
+
+            self.running_jobs += 1
+            try:
+                result = await job.factory()
+                self.completed_jobs += 1
+                metrics.GENERATION_JOBS.inc(priority=priority_name, outcome="completed")
+                if not job.future.done():
+                    job.future.set_result(result)
+            except asyncio.CancelledError:
+                job.future.cancel()
+                raise
+            except Exception as e:
+                self.failed_jobs += 1
+                metrics.GENERATION_JOBS.inc(priority=priority_name, outcome="failed")
+                logger.error(f"💥 Generation job {job.label} failed: {e}")
+                if not job.future.done():
+                    job.future.set_exception(e)
+            finally:
+                self.running_jobs -= 1
+
+    async def stop(self) -> None:
+        """Cancel workers and drop everything still queued."""
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        self.available = None
+        while self.queue:
+            self._drop(heapq.heappop(self.queue), "scheduler stopped")
+
+    def is_idle(self) -> bool:
+        """Check whether nothing is queued or running."""
+        return not self.queue and self.running_jobs == 0
+
+    def get_stats(self) -> Dict:
+        """Get queue depth and job counters."""
+        depth = {name: 0 for name in PRIORITY_NAMES.values()}
+        for job in self.queue:
+            depth[PRIORITY_NAMES.get(job.priority, str(job.priority))] += 1
+        return {
+            'queued': len(self.queue),
+            'queued_by_priority': depth,
+            'running': self.running_jobs,
+            'completed': self.completed_jobs,
+            'failed': self.failed_jobs,
+            'dropped': self.dropped_jobs,
+        }
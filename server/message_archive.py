@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Local SQLite archive of group chat history with full-text search.
+
+Scraper pages (raw GroupMe messages), scraper output files and live poll/webhook messages all
+land in one table keyed by the GroupMe message ID. Re-ingesting a message only refreshes its
+like count. An FTS5 index over the text (kept in sync by triggers) and indexes on user, time
+and likes serve searches and top-message queries in milliseconds.
+
+Import scraper output from the repository root:
+    python -m server.message_archive import scraped/*.csv inspiring_messages.csv
+    python -m server.message_archive search "lemonade" --order likes
+"""
+
+import os
+import csv
+import json
+import time
+import sqlite3
+import logging
+import argparse
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS archive_messages (
+    id INTEGER PRIMARY KEY,  -- GroupMe message ID
+    group_id TEXT,
+    user_id TEXT,
+    user_name TEXT,
+    text TEXT NOT NULL DEFAULT '',
+    created_at INTEGER NOT NULL,
+    likes INTEGER NOT NULL DEFAULT 0,
+    attachments INTEGER NOT NULL DEFAULT 0,
+    source TEXT NOT NULL,  -- How it was first archived: scrape, poll, webhook or import
+    archived_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS archive_user_time ON archive_messages (user_id, created_at);
+CREATE INDEX IF NOT EXISTS archive_group_time ON archive_messages (group_id, created_at);
+CREATE INDEX IF NOT EXISTS archive_time ON archive_messages (created_at);
+CREATE INDEX IF NOT EXISTS archive_likes ON archive_messages (likes, created_at);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS archive_fts USING fts5(
+    text, content='archive_messages', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS archive_fts_insert AFTER INSERT ON archive_messages BEGIN
+    INSERT INTO archive_fts (rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS archive_fts_delete AFTER DELETE ON archive_messages BEGIN
+    INSERT INTO archive_fts (archive_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+CREATE TRIGGER IF NOT EXISTS archive_fts_update AFTER UPDATE OF text ON archive_messages BEGIN
+    INSERT INTO archive_fts (archive_fts, rowid, text) VALUES ('delete', old.id, old.text);
+    INSERT INTO archive_fts (rowid, text) VALUES (new.id, new.text);
+END;
+"""
+
+# Control characters that mark matches in search snippets, chosen because chat text does not contain them
+SNIPPET_START = "\x02"
+SNIPPET_END = "\x03"
+
+# Sort orders for search(); relevance needs a text query
+ORDERS = {
+    'recent': "m.created_at DESC, m.id DESC",
+    'oldest': "m.created_at ASC, m.id ASC",
+    'likes': "m.likes DESC, m.created_at DESC",
+    'relevance': "bm25(archive_fts), m.created_at DESC",
+}
+
+def to_fts_query(query: str) -> str:
+    """
+    Turn free text into a safe FTS5 query: every word must match, a trailing * matches a prefix.
+
+    Quoting each word keeps punctuation and FTS operators in user input from being parsed as syntax.
+    """
+    terms = []
+    for word in query.split():
+        prefix = word.endswith('*')
+        word = word.rstrip('*').replace('"', '""')
+        if word:
+            terms.append(f'"{word}"' + ('*' if prefix else ''))
+    return " ".join(terms)
+
+def iter_scraped_rows(path: str) -> Iterator[Dict]:
+    """
+    Stream rows from scraper output (.csv or .jsonl) or a message corpus (.arrow or .parquet).
+
+    Only corpora need pyarrow, so it is imported for those alone.
+    """
+    if path.endswith(('.arrow', '.parquet')):
+        from groupme.message_corpus import load_corpus
+        for batch in load_corpus(path).to_batches():
+            yield from batch.to_pylist()
+        return
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.endswith('.jsonl'):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(f)
+
+class MessageArchive:
+    """
+    SQLite archive of chat history, safe to use from several threads.
+
+    Writes are small batched upserts, so callers on the event loop should run them with
+    asyncio.to_thread.
+    """
+
+    def __init__(self, path: str):
+        """
+        Open (or create) the archive.
+
+        Args:
+            path (str): SQLite database file; its directory is created if needed
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+        self.db_lock = threading.Lock()  # Serializes use of the connection
+
+    def _upsert(self, rows: List[tuple]) -> int:
+        """
+        Insert rows, or refresh the like count of messages already archived.
+
+        Returns:
+            int: Number of messages that were new to the archive
+        """
+        if not rows:
+            return 0
+        with self.db_lock, self.conn:
+            # rowcount counts only these statements' rows, not the FTS trigger writes
+            new = self.conn.executemany(
+                "INSERT OR IGNORE INTO archive_messages "
+                "(id, group_id, user_id, user_name, text, created_at, likes, attachments, source, archived_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            ).rowcount
+            # Likes keep changing after a message is posted; keep the latest count
+            updated = self.conn.executemany(
+                "UPDATE archive_messages SET likes = ? WHERE id = ? AND likes != ?",
+                [(row[6], row[0], row[6]) for row in rows]
+            ).rowcount
+        logger.debug(f"🗄️ Archived {new} new messages ({updated} like counts updated)")
+        return new
+
+    def add_api_messages(self, messages: Iterable[Dict], source: str = "scrape") -> int:
+        """
+        Archive raw GroupMe API messages, e.g. a scraper page.
+
+        Returns:
+            int: Number of messages that were new to the archive
+        """
+        now = time.time()
+        return self._upsert([
+            (int(msg['id']), msg.get('group_id'), msg.get('user_id'), msg.get('name', 'Unknown'), msg.get('text') or '',
+             msg.get('created_at') or 0, len(msg.get('favorited_by') or []), len(msg.get('attachments') or []), source, now)
+            for msg in messages if msg.get('id')
+        ])
+
+    def add_polled_messages(self, messages: Iterable[Dict], source: str = "poll") -> int:
+        """
+        Archive messages in the format poll_new_messages and parse_callback_message return.
+
+        Returns:
+            int: Number of messages that were new to the archive
+        """
+        now = time.time()
+        return self._upsert([
+            (int(msg['id']), msg.get('group_id'), msg.get('user_id'), msg.get('name', 'Unknown'), msg.get('text') or '',
+             msg.get('created_at') or 0, msg.get('likes', 0), 0, source, now)
+            for msg in messages if msg.get('id')
+        ])
+
+    def add_scraped_rows(self, rows: Iterable[Dict], source: str = "import") -> int:
+        """
+        Archive rows of scraper output (CSV or JSON Lines, see MESSAGE_FIELDS).
+
+        Returns:
+            int: Number of messages that were new to the archive
+        """
+        def to_int(value) -> int:
+            return int(float(value)) if value not in (None, '') else 0
+
+        now = time.time()
+        return self._upsert([
+            (int(row['message_id']), row.get('group_id') or None, row.get('user_id') or None, row.get('user_name') or 'Unknown',
+             row.get('text') or '', to_int(row.get('timestamp')), to_int(row.get('likes')), to_int(row.get('attachments')), source, now)
+            for row in rows if row.get('message_id')
+        ])
+
+    def search(self, query: str = None, user_id: str = None, group_id: str = None, since: int = None, until: int = None,
+               min_likes: int = None, order: str = None, limit: int = 50, offset: int = 0) -> List[Dict]:
+        """
+        Search the archive.
+
+        Args:
+            query (str): Words that must all appear in the text (a trailing * matches a prefix)
+            user_id (str): Only messages from this user
+            group_id (str): Only messages in this group
+            since (int): Only messages created at or after this Unix timestamp
+            until (int): Only messages created before this Unix timestamp
+            min_likes (int): Only messages with at least this many likes
+            order (str): 'recent', 'oldest', 'likes' or 'relevance' (default: relevance with a query, else recent)
+            limit (int): Maximum results
+            offset (int): Results to skip, for paging
+
+        Returns:
+            List[Dict]: Matching messages; with a query each has a 'snippet' with the matches
+                between SNIPPET_START and SNIPPET_END
+
+        Raises:
+            ValueError: If the order is unknown, or relevance is asked for without a query
+        """
+        fts_query = to_fts_query(query) if query else ""
+        order = order or ('relevance' if fts_query else 'recent')
+        if order not in ORDERS:
+            raise ValueError(f"Unknown order {order!r}, expected one of {sorted(ORDERS)}")
+        if order == 'relevance' and not fts_query:
+            raise ValueError("Ordering by relevance needs a search query")
+
+        columns = "m.id, m.group_id, m.user_id, m.user_name, m.text, m.created_at, m.likes, m.attachments, m.source"
+        clauses, params = [], []
+        if fts_query:
+            columns += f", snippet(archive_fts, 0, '{SNIPPET_START}', '{SNIPPET_END}', '…', 16) AS snippet"
+            source = "archive_fts JOIN archive_messages m ON m.id = archive_fts.rowid"
+            clauses.append("archive_fts MATCH ?")
+            params.append(fts_query)
+        else:
+            source = "archive_messages m"
+        for clause, value in (("m.user_id = ?", user_id), ("m.group_id = ?", group_id), ("m.created_at >= ?", since),
+                              ("m.created_at < ?", until), ("m.likes >= ?", min_likes)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        params.extend([limit, offset])
+
+        with self.db_lock:
+            rows = self.conn.execute(
+                f"SELECT {columns} FROM {source} {where} ORDER BY {ORDERS[order]} LIMIT ? OFFSET ?", params
+            ).fetchall()
+        return [{**dict(row), 'id': str(row['id'])} for row in rows]
+
+    def get_stats(self) -> Dict:
+        """Get message, user and group counts plus the archived time range."""
+        with self.db_lock:
+            row = self.conn.execute(
+                "SELECT COUNT(*) AS messages, COUNT(DISTINCT user_id) AS users, COUNT(DISTINCT group_id) AS groups, "
+                "MIN(created_at) AS first_at, MAX(created_at) AS last_at FROM archive_messages"
+            ).fetchone()
+            sources = self.conn.execute("SELECT source, COUNT(*) FROM archive_messages GROUP BY source").fetchall()
+        return {**dict(row), 'sources': {source: count for source, count in sources}}
+
+    def close(self) -> None:
+        with self.db_lock:
+            self.conn.close()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Import into or search the KellerBot message archive.")
+    parser.add_argument("--db", default="data/archive.db", help="Archive database (default: data/archive.db)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import", help="Import scraper output (.csv or .jsonl) or corpus (.arrow or .parquet) files")
+    import_parser.add_argument("sources", nargs="+")
+
+    search_parser = commands.add_parser("search", help="Search archived messages")
+    search_parser.add_argument("query", nargs="?", default=None)
+    search_parser.add_argument("--user-id")
+    search_parser.add_argument("--min-likes", type=int)
+    search_parser.add_argument("--order", choices=sorted(ORDERS))
+    search_parser.add_argument("--limit", type=int, default=20)
+
+    commands.add_parser("stats", help="Show archive totals")
+    args = parser.parse_args()
+
+    archive = MessageArchive(args.db)
+    if args.command == "import":
+        for path in args.sources:
+            started = time.perf_counter()
+            new = 0
+            batch = []
+            for row in iter_scraped_rows(path):
+                batch.append(row)
+                if len(batch) >= 1000:
+                    new += archive.add_scraped_rows(batch)
+                    batch = []
+            new += archive.add_scraped_rows(batch)
+            print(f"✅ {path}: {new} new messages in {time.perf_counter() - started:.2f}s")
+    elif args.command == "search":
+        started = time.perf_counter()
+        results = archive.search(args.query, user_id=args.user_id, min_likes=args.min_likes, order=args.order, limit=args.limit)
+        for message in results:
+            when = datetime.fromtimestamp(message['created_at']).strftime("%Y-%m-%d %H:%M")
+            text = " ".join((message.get('snippet') or message['text']).split())
+            text = text.replace(SNIPPET_START, "[").replace(SNIPPET_END, "]")
+            print(f"{when}  ❤️ {message['likes']:<3} {message['user_name']}: {text}")
+        print(f"\n🔎 {len(results)} results in {(time.perf_counter() - started) * 1000:.1f}ms")
+    else:
+        for key, value in archive.get_stats().items():
+            print(f"{key}: {value}")
+    archive.close()
+
+if __name__ == "__main__":
+    main()
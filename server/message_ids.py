@@ -0,0 +1,49 @@
+import os
+import time
+import threading
+from datetime import datetime
+
+# ULID-style IDs: 48-bit millisecond timestamp + 80 random bits, Crockford base32 encoded
+# to 26 characters. IDs sort lexicographically in creation order, and IDs made in the same
+# millisecond increment the random part so they stay unique and ordered.
+CROCKFORD_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+TIMESTAMP_CHARS = 10
+RANDOM_CHARS = 16
+RANDOM_BITS = 80
+
+_lock = threading.Lock()
+_last_timestamp = -1
+_last_random = 0
+
+def _encode(value: int, length: int) -> str:
+    """Encode an integer as fixed-width Crockford base32."""
+    chars = []
+    for _ in range(length):
+        chars.append(CROCKFORD_ALPHABET[value & 31])
+        value >>= 5
+    return ''.join(reversed(chars))
+
+def new_message_id() -> str:
+    """Generate a unique, monotonically increasing message ID."""
+    global _last_timestamp, _last_random
+    with _lock:
+        timestamp = int(time.time() * 1000)
+        if timestamp <= _last_timestamp:
+            # Same millisecond (or the clock went back): keep ordering by bumping the random part
+            timestamp = _last_timestamp
+            random_part = (_last_random + 1) & ((1 << RANDOM_BITS) - 1)
+            if random_part == 0:
+                timestamp += 1
+        else:
+            random_part = int.from_bytes(os.urandom(10), 'big')
+        _last_timestamp = timestamp
+        _last_random = random_part
+    return _encode(timestamp, TIMESTAMP_CHARS) + _encode(random_part, RANDOM_CHARS)
+
+def message_id_bound(moment: datetime) -> str:
+    """
+    Get the smallest possible ID for a point in time, for time-range queries.
+
+    Every ID created at or after moment compares >= the result, and every ID created before it compares <.
+    """
+    return _encode(int(moment.timestamp() * 1000), TIMESTAMP_CHARS) + "0" * RANDOM_CHARS
@@ -1,10 +1,15 @@
 import json
 import time
+import random
 import asyncio
 import logging
+from collections import OrderedDict, deque
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 from message_gen.message_generator import MessageGenerator
+from server.message_store import MessageStore
+from server.message_ids import new_message_id, message_id_bound
+import metrics
 
 # Configure logging
 logging.basicConfig(
@@ -14,11 +19,14 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Number of message changes remembered for delta queries; older cursors get a full reset
+CHANGE_LOG_SIZE = 5000
+
 class MessageObject:
     """Represents a message with multiple generation attempts and metadata."""
     
     def __init__(self, message_type: str, reply_to_id: str = None, original_message: str = None, username: str = None):
-        self.id = str(int(time.time() * 1000))  # Unique ID
+        self.id = new_message_id()  # Unique, time-sortable ID
         self.message_type = message_type  # 'random', 'reply', 'introduction', 'manual'
         self.reply_to_id = reply_to_id
         self.original_message = original_message
@@ -49,6 +57,19 @@ class MessageObject:
             return True
         return False
     
+    @classmethod
+    def from_dict(cls, data: Dict) -> "MessageObject":
+        """Rebuild a message object from its to_dict() form."""
+        message_obj = cls(data['message_type'], data.get('reply_to_id'), data.get('original_message'), data.get('username'))
+        message_obj.id = data['id']
+        message_obj.timestamp = datetime.fromisoformat(data['timestamp'])
+        message_obj.generated_messages = list(data.get('generated_messages', []))
+        message_obj.selected_message = data.get('selected_message')
+        message_obj.sent = data.get('sent', False)
+        message_obj.deleted = data.get('deleted', False)
+        message_obj.generating = data.get('generating', False)
+        return message_obj
+    
     def to_dict(self) -> Dict:
         """Convert to dictionary for JSON serialization."""
         return {
@@ -72,10 +93,228 @@ class MessageManager:
         self.config_path = config_path
         self.config = self.load_config()
         self.message_generator = MessageGenerator()
-        self.messages: List[MessageObject] = []
+        # Messages by ID (insertion ordered, oldest first) plus state partitions kept in sync by
+        # _on_change, so lookups and counts never scan the whole history
+        self.messages: Dict[str, MessageObject] = {}
+        self.pending_ids: Dict[str, None] = {}  # Ordered set: not sent and not deleted
+        self.generating_ids = set()
+        self.sent_ids = set()
+        self.deleted_ids = set()
+        self.sweep_task = None
+        self.subscribers = set()  # Event queues for dashboard push (see subscribe)
+        self.version = 0  # Bumped on every message change, for delta queries
+        self.version_epoch = f"{time.time_ns():x}"  # Tells cursors from before a restart apart
+        self.change_log: OrderedDict = OrderedDict()  # Message ID -> version of its last change, oldest first
+        self.change_log_floor = 0  # Changes at or below this version have left the change log
         self.last_random_message_time = datetime.now()
         self.messages_per_day = 0
+        self.reply_decisions = deque(maxlen=500)  # Recent reply dice rolls, for auditing
+        self.store = None
         self.reset_daily_counter()
+        
+        # Durable store, replayed so pending messages and the daily quota survive restarts
+        store_path = self.config.get("message_store_path")
+        if store_path:
+            self.store = MessageStore(store_path, self.config.get("message_store_flush_interval_seconds", 1.0))
+            self._restore_from_store()
+    
+    def _restore_from_store(self):
+        """Replay messages and the daily counter from the store."""
+        restored = [MessageObject.from_dict(data) for data in self.store.load_messages()]
+        restored.sort(key=lambda msg: msg.timestamp)
+        for message_obj in restored:
+            self.messages[message_obj.id] = message_obj
+            if message_obj.generating:
+                # Generation was interrupted by the restart; keep whatever candidates made it
+                message_obj.stop_generation()
+                if not message_obj.generated_messages:
+                    message_obj.deleted = True
+                self._on_change(message_obj)
+            else:
+                self._reindex(message_obj)
+        
+        state = self.store.load_state()
+        if 'last_random_message_time' in state:
+            self.last_random_message_time = datetime.fromisoformat(state['last_random_message_time'])
+            self.messages_per_day = state.get('messages_per_day', 0)
+        
+        pending = self.get_pending_messages_count()
+        logger.info(f"💾 Restored {len(self.messages)} messages ({pending} pending) and {self.messages_per_day} random messages today from {self.store.path}")
+    
+    def _reindex(self, message_obj: MessageObject):
+        """Move a message into the state partitions matching its flags."""
+        message_id = message_obj.id
+        if message_obj.sent or message_obj.deleted:
+            self.pending_ids.pop(message_id, None)
+        else:
+            self.pending_ids[message_id] = None
+        for ids, flag in ((self.generating_ids, message_obj.generating),
+                          (self.sent_ids, message_obj.sent),
+                          (self.deleted_ids, message_obj.deleted)):
+            if flag:
+                ids.add(message_id)
+            else:
+                ids.discard(message_id)
+    
+    def _unindex(self, message_id: str):
+        """Forget a message entirely."""
+        self.messages.pop(message_id, None)
+        self.pending_ids.pop(message_id, None)
+        self.generating_ids.discard(message_id)
+        self.sent_ids.discard(message_id)
+        self.deleted_ids.discard(message_id)
+    
+    def _on_change(self, message_obj: MessageObject, event: str = None):
+        """
+        Update the indexes for a changed message, queue it for the next store flush and
+        publish the change to subscribers.
+        
+        Args:
+            message_obj (MessageObject): The changed message
+            event (str): Event name to publish ('created', 'candidate_added', 'finished',
+                'selected', 'sent', 'deleted'); None publishes nothing
+        """
+        self._reindex(message_obj)
+        self._record_change(message_obj.id)
+        message_dict = message_obj.to_dict()
+        if self.store is not None:
+            self.store.mark_dirty(message_dict)
+        if event is not None:
+            self._publish({'event': event, 'message': message_dict})
+    
+    def _record_change(self, message_id: str):
+        """Bump the version and move a message to the end of the change log."""
+        self.version += 1
+        self.change_log[message_id] = self.version
+        self.change_log.move_to_end(message_id)
+        while len(self.change_log) > CHANGE_LOG_SIZE:
+            _, self.change_log_floor = self.change_log.popitem(last=False)
+    
+    def get_version_cursor(self) -> str:
+        """Get an opaque cursor for the current state of the messages."""
+        return f"{self.version_epoch}-{self.version}"
+    
+    def _parse_cursor(self, cursor: str) -> Optional[int]:
+        """Get the version from a cursor, or None if it is missing or from another process."""
+        if not cursor:
+            return None
+        epoch, _, version = cursor.partition('-')
+        if epoch != self.version_epoch or not version.isdigit() or int(version) > self.version:
+            return None
+        return int(version)
+    
+    def get_changes(self, cursor: str = None) -> Dict:
+        """
+        Get the messages changed since a cursor returned by an earlier call.
+        
+        Changed messages are returned in full (sent and deleted ones included, so clients can
+        drop them); messages evicted by the retention sweep are returned as removed IDs. If the
+        cursor is missing, unknown or too old, 'reset' is set and 'changed' holds every pending
+        message instead.
+        
+        Args:
+            cursor (str): Cursor from a previous call, or None for a full snapshot
+            
+        Returns:
+            Dict: 'cursor' for the next call, 'reset', 'changed' message dicts and 'removed' IDs
+        """
+        since = self._parse_cursor(cursor)
+        if since is None or since < self.change_log_floor:
+            return {
+                'cursor': self.get_version_cursor(),
+                'reset': True,
+                'changed': [msg.to_dict() for msg in self.get_pending_messages()],
+                'removed': []
+            }
+        
+        changed, removed = [], []
+        # Walk back from the newest change until we reach what the client already has
+        for message_id, version in reversed(self.change_log.items()):
+            if version <= since:
+                break
+            msg = self.messages.get(message_id)
+            if msg is None:
+                removed.append(message_id)
+            else:
+                changed.append(msg.to_dict())
+        changed.reverse()
+        removed.reverse()
+        return {
+            'cursor': self.get_version_cursor(),
+            'reset': False,
+            'changed': changed,
+            'removed': removed
+        }
+    
+    def subscribe(self, max_queued: int = 100) -> asyncio.Queue:
+        """
+        Subscribe to message events.
+        
+        If a subscriber falls more than max_queued events behind, its queue is cleared and a
+        single 'resync' event is queued so it can reload everything.
+        
+        Returns:
+            asyncio.Queue: Queue receiving {'event': ..., 'message': ...} dicts
+        """
+        queue = asyncio.Queue(maxsize=max_queued)
+        self.subscribers.add(queue)
+        return queue
+    
+    def unsubscribe(self, queue: asyncio.Queue):
+        """Stop delivering events to a queue returned by subscribe."""
+        self.subscribers.discard(queue)
+    
+    def _publish(self, event: Dict):
+        """Deliver an event to every subscriber without blocking."""
+        for queue in self.subscribers:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({'event': 'resync'})
+    
+    def _save_daily_counter(self):
+        """Queue the daily random message counter for the next store flush."""
+        if self.store is not None:
+            self.store.set_state('messages_per_day', self.messages_per_day)
+            self.store.set_state('last_random_message_time', self.last_random_message_time.isoformat())
+    
+    def _add_message(self, message_obj: MessageObject):
+        """Track a new message and persist it."""
+        self.messages[message_obj.id] = message_obj
+        self._on_change(message_obj, "created")
+    
+    def start_sweeper(self):
+        """Start the background task that evicts messages past the retention period."""
+        if self.sweep_task is None or self.sweep_task.done():
+            self.sweep_task = asyncio.create_task(self._sweep_loop())
+    
+    async def stop_sweeper(self):
+        """Stop the background eviction task."""
+        if self.sweep_task is not None:
+            self.sweep_task.cancel()
+            try:
+                await self.sweep_task
+            except asyncio.CancelledError:
+                pass
+            self.sweep_task = None
+    
+    async def _sweep_loop(self):
+        """Periodically evict old messages."""
+        while True:
+            await asyncio.sleep(self.config.get("message_sweep_interval_seconds", 3600))
+            try:
+                self.cleanup_old_messages()
+            except Exception as e:
+                logger.error(f"💥 Error sweeping old messages: {e}")
+    
+    async def close(self):
+        """Stop the sweeper, then flush and close the message store."""
+        await self.stop_sweeper()
+        if self.store is not None:
+            await self.store.close()
+            self.store = None
     
     def load_config(self) -> Dict:
         """Load configuration from JSON file."""
@@ -89,6 +328,22 @@ class MessageManager:
                 "minimum_reply_chance": 0.01,
                 "message_generation_tries": 3,
                 "polling_interval_seconds": 120,
+                "min_polling_interval_seconds": 10,
+                "max_polling_interval_seconds": 600,
+                "polling_backoff_factor": 1.5,
+                "ingestion_mode": "polling",
+                "generation_concurrency": 2,
+                "generation_queue_size": 20,
+                "generation_max_queue_age_seconds": 300,
+                "batched_generation": True,
+                "warm_pool_size_per_type": 1,
+                "warm_pool_max_age_seconds": 21600,
+                "warm_pool_daily_token_budget": 200000,
+                "message_store_path": "data/messages.db",
+                "message_store_flush_interval_seconds": 1.0,
+                "message_retention_days": 7,
+                "message_sweep_interval_seconds": 3600,
+                "message_archive_path": "data/archive.db",
                 "introduction_prompt": "Introduce yourself as a friendly bot that's here to chat and help out!"
             }
     
@@ -107,6 +362,27 @@ class MessageManager:
             if polling_interval > 3600:
                 raise ValueError("Polling interval cannot be more than 3600 seconds (1 hour)")
         
+        # Validate adaptive polling bounds
+        min_interval = new_config.get('min_polling_interval_seconds', self.config.get('min_polling_interval_seconds'))
+        max_interval = new_config.get('max_polling_interval_seconds', self.config.get('max_polling_interval_seconds'))
+        if min_interval is not None and min_interval <= 0:
+            raise ValueError("Minimum polling interval must be greater than 0 seconds")
+        if max_interval is not None and max_interval > 3600:
+            raise ValueError("Maximum polling interval cannot be more than 3600 seconds (1 hour)")
+        if min_interval is not None and max_interval is not None and min_interval > max_interval:
+            raise ValueError("Minimum polling interval cannot be greater than maximum polling interval")
+        if new_config.get('polling_backoff_factor', 1) < 1:
+            raise ValueError("Polling backoff factor must be at least 1")
+        
+        # Validate generation queue limits
+        for key in ('generation_concurrency', 'generation_queue_size'):
+            if key in new_config and new_config[key] < 1:
+                raise ValueError(f"{key} must be at least 1")
+        
+        # Validate ingestion mode
+        if new_config.get('ingestion_mode', 'polling') not in ('polling', 'webhook', 'both'):
+            raise ValueError("Ingestion mode must be 'polling', 'webhook' or 'both'")
+        
         self.config.update(new_config)
         self.save_config()
     
@@ -114,9 +390,16 @@ class MessageManager:
         """Reset daily message counter."""
         self.messages_per_day = 0
         self.last_random_message_time = datetime.now()
+        self._save_daily_counter()
     
-    def should_send_random_message(self) -> bool:
-        """Check if it's time to send a random message based on probability."""
+    def should_send_random_message(self, elapsed_seconds: float = None) -> bool:
+        """
+        Check if it's time to send a random message based on probability.
+        
+        Args:
+            elapsed_seconds (float): Seconds covered by this check. Defaults to the configured polling
+                interval; the adaptive scheduler passes the real gap so the daily target holds.
+        """
         now = datetime.now()
         
         # Reset counter if it's a new day
@@ -124,15 +407,14 @@ class MessageManager:
             self.reset_daily_counter()
         
         # Calculate probability based on desired messages per day
-        # Use configurable polling interval to calculate cycles per day
-        polling_interval = self.config.get("polling_interval_seconds", 120)  # Default to 120 seconds (2 minutes)
+        # Use the time covered by this check to calculate cycles per day
+        polling_interval = elapsed_seconds or self.config.get("polling_interval_seconds", 120)  # Default to 120 seconds (2 minutes)
         seconds_per_day = 24 * 60 * 60  # 24 hours * 60 minutes * 60 seconds
         cycles_per_day = seconds_per_day / polling_interval
         target_messages = self.config["random_messages_per_day"]
         probability_per_cycle = target_messages / cycles_per_day
         
         # Use random chance to determine if we should send a message
-        import random
         should_send = random.random() < probability_per_cycle
         
         if should_send:
@@ -147,21 +429,25 @@ class MessageManager:
         logger.info(f"⏳ Waiting for {len(tasks)} concurrent {message_type} generation tasks to complete...")
         
         try:
-            messages = await asyncio.gather(*tasks, return_exceptions=True)
-            
             success_count = 0
             error_count = 0
             
-            for i, message in enumerate(messages):
-                if isinstance(message, Exception):
-                    error_msg = f"Error generating {message_type}: {message}"
+            # Add each candidate as soon as it's ready so the dashboard can show it right away
+            for i, task in enumerate(asyncio.as_completed(tasks)):
+                try:
+                    message = await task
+                except Exception as e:
+                    error_msg = f"Error generating {message_type}: {e}"
                     message_obj.add_generated_message(error_msg)
                     error_count += 1
-                    logger.error(f"  ❌ {message_type.capitalize()} task {i+1} failed: {message}")
+                    metrics.CANDIDATES.inc(message_type=message_type, result="error")
+                    logger.error(f"  ❌ {message_type.capitalize()} task {i+1} failed: {e}")
                 else:
                     message_obj.add_generated_message(message)
                     success_count += 1
+                    metrics.CANDIDATES.inc(message_type=message_type, result="ok")
                     logger.info(f"  ✅ {message_type.capitalize()} task {i+1} completed: {message[:50]}...")
+                self._on_change(message_obj, "candidate_added")
             
             logger.info(f"🎯 {message_type.capitalize()} generation completed - {success_count} successful, {error_count} failed")
             
@@ -170,66 +456,135 @@ class MessageManager:
             message_obj.add_generated_message(error_msg)
             logger.error(f"💥 Critical error in {message_type} generation: {e}")
     
+    async def _generate_candidates(self, message_obj: MessageObject, message_type: str, batch_call, single_call) -> None:
+        """
+        Fill a message object with message_generation_tries candidates.
+        
+        In batched mode all candidates come from one request; if that fails (or batching is
+        off) it falls back to one concurrent request per candidate.
+        
+        Args:
+            message_obj (MessageObject): Message to add candidates to
+            message_type (str): Message type, for logging
+            batch_call: Function taking a count and returning a coroutine for a list of messages
+            single_call: Zero-argument function returning a coroutine for one message
+        """
+        with metrics.GENERATION_SECONDS.time(message_type=message_type):
+            tries = self.config["message_generation_tries"]
+            
+            if self.config.get("batched_generation", True) and tries > 1:
+                logger.info(f"  📝 Requesting {tries} {message_type} candidates in one batched request")
+                try:
+                    messages = await batch_call(tries)
+                    for message in messages:
+                        message_obj.add_generated_message(message)
+                    metrics.CANDIDATES.inc(len(messages), message_type=message_type, result="ok")
+                    self._on_change(message_obj, "candidate_added")
+                    logger.info(f"🎯 {message_type.capitalize()} batched generation completed - {len(messages)} candidates")
+                    return
+                except Exception as e:
+                    logger.warning(f"⚠️ Batched {message_type} generation failed, falling back to one request per candidate: {e}")
+            
+            # Create all generation tasks concurrently
+            tasks = []
+            for i in range(tries):
+                logger.info(f"  📝 Creating {message_type} generation task {i+1}/{tries}")
+                tasks.append(single_call())
+            
+            # Execute tasks using shared helper
+            await self._execute_generation_tasks(message_obj, tasks, message_type)
+    
     async def generate_random_message(self) -> MessageObject:
         """Generate a random message object."""
         message_obj = MessageObject("random")
         message_obj.start_generation()
-        self.messages.append(message_obj)
+        self._add_message(message_obj)
         
         logger.info(f"🚀 Starting random message generation (ID: {message_obj.id}) - {self.config['message_generation_tries']} attempts")
         
-        # Create all generation tasks concurrently
-        tasks = []
-        for i in range(self.config["message_generation_tries"]):
-            logger.info(f"  📝 Creating generation task {i+1}/{self.config['message_generation_tries']}")
-            tasks.append(self.message_generator.generate_message())
-        
-        # Execute tasks using shared helper
-        await self._execute_generation_tasks(message_obj, tasks, "random")
+        await self._generate_candidates(
+            message_obj, "random",
+            lambda count: self.message_generator.generate_messages(count),
+            lambda: self.message_generator.generate_message()
+        )
         
         message_obj.stop_generation()
+        self._on_change(message_obj, "finished")
         self.messages_per_day += 1
         self.last_random_message_time = datetime.now()
+        self._save_daily_counter()
         
         logger.info(f"🏁 Random message generation finished (ID: {message_obj.id}) - Total messages today: {self.messages_per_day}")
         
         return message_obj
     
-    async def generate_reply_message(self, reply_to_id: str, original_message: str, likes: int, username: str = None) -> Optional[MessageObject]:
-        """Generate a reply message based on like count and chance."""
+    def decide_reply(self, reply_to_id: str, original_message: str, likes: int) -> Dict:
+        """
+        Roll the reply dice for an incoming message, before any generation work is queued.
+        
+        The decision and its inputs are kept in reply_decisions for auditing.
+        
+        Returns:
+            Dict: Decision record; 'reply' is True if a reply should be generated
+        """
         # Calculate reply probability based on likes
         reply_probability = min(self.config["reply_chance_per_like"] * likes, 1.0)
 
         # higher probability if message references Keller
-        if "Keller" in original_message or "keller" in original_message:
+        mentions_keller = "keller" in original_message.lower()
+        if mentions_keller:
             reply_probability += 1
         
         if reply_probability < self.config["minimum_reply_chance"]:
             reply_probability = self.config["minimum_reply_chance"]
         
         # Random decision based on probability
-        import random
-        if random.random() > reply_probability:
-            logger.info(f"🎲 Reply generation skipped - probability {reply_probability:.2f} too low (likes: {likes})")
-            return None
+        roll = random.random()
+        decision = {
+            'message_id': reply_to_id,
+            'timestamp': datetime.now().isoformat(),
+            'likes': likes,
+            'mentions_keller': mentions_keller,
+            'reply_chance_per_like': self.config["reply_chance_per_like"],
+            'minimum_reply_chance': self.config["minimum_reply_chance"],
+            'reply_probability': reply_probability,
+            'roll': roll,
+            'reply': roll <= reply_probability
+        }
+        self.reply_decisions.append(decision)
+        metrics.REPLY_DECISIONS.inc(outcome="reply" if decision['reply'] else "skip")
         
+        if decision['reply']:
+            logger.info(f"🎲 Reply generation triggered - probability {reply_probability:.2f}, roll {roll:.2f} (likes: {likes})")
+        else:
+            logger.info(f"🎲 Reply generation skipped - probability {reply_probability:.2f} too low (likes: {likes})")
+        return decision
+    
+    def add_random_message(self, message_obj: MessageObject) -> None:
+        """Add an already generated random message (e.g. from the warm pool) as pending."""
+        self._add_message(message_obj)
+        self.messages_per_day += 1
+        self.last_random_message_time = datetime.now()
+        self._save_daily_counter()
+        logger.info(f"⚡ Random message {message_obj.id} served from warm pool - Total messages today: {self.messages_per_day}")
+    
+    async def generate_reply_message(self, reply_to_id: str, original_message: str, likes: int, username: str = None) -> MessageObject:
+        """Generate a reply message. The reply dice are rolled beforehand by decide_reply."""
         message_obj = MessageObject("reply", reply_to_id, original_message, username)
         message_obj.start_generation()
-        self.messages.append(message_obj)
+        self._add_message(message_obj)
         
         logger.info(f"💬 Starting reply generation (ID: {message_obj.id}) to message {reply_to_id} with {likes} likes - {self.config['message_generation_tries']} attempts")
         logger.info(f"  📖 Original message: {original_message[:100]}...")
         
-        # Create all generation tasks concurrently
-        tasks = []
-        for i in range(self.config["message_generation_tries"]):
-            logger.info(f"  📝 Creating reply generation task {i+1}/{self.config['message_generation_tries']}")
-            tasks.append(self.message_generator.generate_reply(original_message, username))
-        
-        # Execute tasks using shared helper
-        await self._execute_generation_tasks(message_obj, tasks, "reply")
+        await self._generate_candidates(
+            message_obj, "reply",
+            lambda count: self.message_generator.generate_replies(original_message, count, username),
+            lambda: self.message_generator.generate_reply(original_message, username)
+        )
         
         message_obj.stop_generation()
+        self._on_change(message_obj, "finished")
         logger.info(f"🏁 Reply generation finished (ID: {message_obj.id})")
         
         return message_obj
@@ -238,23 +593,21 @@ class MessageManager:
         """Generate an introduction message."""
         message_obj = MessageObject("introduction")
         message_obj.start_generation()
-        self.messages.append(message_obj)
+        self._add_message(message_obj)
         
         prompt = self.config["introduction_prompt"]
         
         logger.info(f"👋 Starting introduction generation (ID: {message_obj.id}) - {self.config['message_generation_tries']} attempts")
         logger.info(f"  📝 Prompt: {prompt[:100]}...")
         
-        # Create all generation tasks concurrently
-        tasks = []
-        for i in range(self.config["message_generation_tries"]):
-            logger.info(f"  📝 Creating introduction generation task {i+1}/{self.config['message_generation_tries']}")
-            tasks.append(self.message_generator.generate_introduction(prompt))
-        
-        # Execute tasks using shared helper
-        await self._execute_generation_tasks(message_obj, tasks, "introduction")
+        await self._generate_candidates(
+            message_obj, "introduction",
+            lambda count: self.message_generator.generate_introductions(prompt, count),
+            lambda: self.message_generator.generate_introduction(prompt)
+        )
         
         message_obj.stop_generation()
+        self._on_change(message_obj, "finished")
         logger.info(f"🏁 Introduction generation finished (ID: {message_obj.id})")
         
         return message_obj
@@ -263,52 +616,130 @@ class MessageManager:
         """Generate a manual test message."""
         message_obj = MessageObject("manual")
         message_obj.start_generation()
-        self.messages.append(message_obj)
+        self._add_message(message_obj)
         
         logger.info(f"🧪 Starting manual test message generation (ID: {message_obj.id}) - {self.config['message_generation_tries']} attempts")
         
-        # Create all generation tasks concurrently
-        tasks = []
-        for i in range(self.config["message_generation_tries"]):
-            logger.info(f"  📝 Creating manual generation task {i+1}/{self.config['message_generation_tries']}")
-            tasks.append(self.message_generator.generate_message())
-        
-        # Execute tasks using shared helper
-        await self._execute_generation_tasks(message_obj, tasks, "manual")
+        await self._generate_candidates(
+            message_obj, "manual",
+            lambda count: self.message_generator.generate_messages(count),
+            lambda: self.message_generator.generate_message()
+        )
         
         message_obj.stop_generation()
+        self._on_change(message_obj, "finished")
         logger.info(f"🏁 Manual message generation finished (ID: {message_obj.id})")
         
         return message_obj
     
     def get_pending_messages(self) -> List[MessageObject]:
         """Get all messages that haven't been sent or deleted."""
-        return [msg for msg in self.messages if not msg.sent and not msg.deleted]
+        return [self.messages[message_id] for message_id in self.pending_ids]
+    
+    def get_pending_messages_count(self) -> int:
+        """Get count of messages that haven't been sent or deleted."""
+        return len(self.pending_ids)
     
     def get_generating_messages_count(self) -> int:
         """Get count of messages currently being generated."""
-        return len([msg for msg in self.messages if msg.generating])
+        return len(self.generating_ids)
+    
+    def get_message_counts(self) -> Dict:
+        """Get message counts by state."""
+        return {
+            'total': len(self.messages),
+            'pending': len(self.pending_ids),
+            'generating': len(self.generating_ids),
+            'sent': len(self.sent_ids),
+            'deleted': len(self.deleted_ids)
+        }
+    
+    async def list_messages(self, after_id: str = None, since: datetime = None, until: datetime = None, limit: int = 50) -> List[Dict]:
+        """
+        Page through message history in ID (creation) order, including sent and deleted messages.
+        With a store configured, messages evicted from memory by the retention sweep are kept in
+        the store and included too; without one, history only reaches back to the retention window.
+        
+        Args:
+            after_id (str): Cursor; only messages with a greater ID are returned
+            since (datetime): Only messages created at or after this time
+            until (datetime): Only messages created before this time
+            limit (int): Maximum number of messages to return
+            
+        Returns:
+            List[Dict]: Message dicts with an 'evicted' flag, oldest first; pass the last ID as after_id for the next page
+        """
+        min_id = message_id_bound(since) if since else None
+        max_id = message_id_bound(until) if until else None
+        
+        if self.store is not None:
+            # Write out anything pending so the page reflects the latest state
+            await asyncio.to_thread(self.store.flush)
+            return await asyncio.to_thread(self.store.query_messages, after_id, min_id, max_id, limit)
+        
+        page = []
+        for message_id in sorted(self.messages):
+            if after_id is not None and message_id <= after_id:
+                continue
+            if min_id is not None and message_id < min_id:
+                continue
+            if max_id is not None and message_id >= max_id:
+                break
+            page.append({**self.messages[message_id].to_dict(), 'evicted': False})
+            if len(page) >= limit:
+                break
+        return page
     
     def get_message_by_id(self, message_id: str) -> Optional[MessageObject]:
         """Get a specific message by ID."""
-        for msg in self.messages:
-            if msg.id == message_id:
-                return msg
-        return None
+        return self.messages.get(message_id)
     
     def mark_message_sent(self, message_id: str):
         """Mark a message as sent."""
         msg = self.get_message_by_id(message_id)
         if msg:
             msg.sent = True
+            self._on_change(msg, "sent")
     
     def delete_message(self, message_id: str):
         """Mark a message as deleted."""
         msg = self.get_message_by_id(message_id)
         if msg:
             msg.deleted = True
+            self._on_change(msg, "deleted")
+    
+    def select_message_option(self, message_id: str, option_index: int) -> bool:
+        """Select a generated option for a message."""
+        msg = self.get_message_by_id(message_id)
+        if msg and msg.select_message(option_index):
+            self._on_change(msg, "selected")
+            return True
+        return False
     
-    def cleanup_old_messages(self, days: int = 7):
-        """Remove messages older than specified days."""
+    def cleanup_old_messages(self, days: float = None) -> int:
+        """
+        Remove messages older than the retention period (message_retention_days by default) from memory.
+        Messages still generating are kept. The store keeps evicted messages for history queries.
+        
+        Returns:
+            int: Number of messages removed
+        """
+        if days is None:
+            days = self.config.get("message_retention_days", 7)
         cutoff_time = datetime.now() - timedelta(days=days)
-        self.messages = [msg for msg in self.messages if msg.timestamp > cutoff_time]
+        expired = []
+        # Messages are stored oldest first, so stop at the first one inside the window
+        for message_id, msg in self.messages.items():
+            if msg.timestamp > cutoff_time:
+                break
+            if not msg.generating:
+                expired.append(message_id)
+        for message_id in expired:
+            self._unindex(message_id)
+            self._record_change(message_id)
+            if self.store is not None:
+                self.store.mark_evicted(message_id)
+            self._publish({'event': 'removed', 'message': {'id': message_id}})
+        if expired:
+            logger.info(f"🧹 Evicted {len(expired)} messages older than {days} days")
+        return len(expired)
@@ -0,0 +1,172 @@
+import os
+import json
+import time
+import sqlite3
+import asyncio
+import logging
+import threading
+from typing import Dict, List, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class MessageStore:
+    """
+    Durable SQLite store for MessageManager state.
+
+    Writes are write-behind: mark_dirty and set_state only snapshot the data in memory, and a
+    background task flushes the batch in one transaction off the event loop every
+    flush_interval seconds. Call flush (or close) on shutdown to write out the last batch.
+
+    Messages evicted from memory stay in the store, flagged as evicted, so history queries still
+    see them; only live messages are restored on startup.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 1.0):
+        """
+        Open (or create) the store.
+
+        Args:
+            path (str): SQLite database file; its directory is created if needed
+            flush_interval (float): Seconds between background flushes
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.flush_interval = flush_interval
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS messages (id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(messages)")]
+        if 'evicted' not in columns:
+            self.conn.execute("ALTER TABLE messages ADD COLUMN evicted INTEGER NOT NULL DEFAULT 0")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self.conn.commit()
+
+        self.lock = threading.Lock()  # Guards the pending batches
+        self.db_lock = threading.Lock()  # Serializes use of the connection
+        self.pending_messages: Dict[str, Dict] = {}
+        self.pending_evictions: set = set()
+        self.pending_state: Dict[str, str] = {}
+        self.flush_task: Optional[asyncio.Task] = None
+
+    def load_messages(self) -> List[Dict]:
+        """Load every stored message dict that has not been evicted, oldest first."""
+        with self.db_lock:
+            rows = self.conn.execute("SELECT data FROM messages WHERE evicted = 0 ORDER BY updated_at").fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def query_messages(self, after_id: str = None, min_id: str = None, max_id: str = None, limit: int = 50) -> List[Dict]:
+        """
+        Get a page of stored messages in ID order using the primary key index, evicted ones included.
+
+        Args:
+            after_id (str): Exclusive lower bound (pagination cursor)
+            min_id (str): Inclusive lower bound (start of a time range)
+            max_id (str): Exclusive upper bound (end of a time range)
+            limit (int): Maximum rows to return
+
+        Returns:
+            List[Dict]: Message dicts with an 'evicted' flag, lowest ID first
+        """
+        clauses, params = [], []
+        if after_id is not None:
+            clauses.append("id > ?")
+            params.append(after_id)
+        if min_id is not None:
+            clauses.append("id >= ?")
+            params.append(min_id)
+        if max_id is not None:
+            clauses.append("id < ?")
+            params.append(max_id)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        params.append(limit)
+        with self.db_lock:
+            rows = self.conn.execute(f"SELECT data, evicted FROM messages {where} ORDER BY id LIMIT ?", params).fetchall()
+        return [{**json.loads(data), 'evicted': bool(evicted)} for data, evicted in rows]
+
+    def load_state(self) -> Dict:
+        """Load every stored state value."""
+        with self.db_lock:
+            rows = self.conn.execute("SELECT key, value FROM state").fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def mark_dirty(self, message_dict: Dict) -> None:
+        """Queue a message snapshot to be written on the next flush."""
+        with self.lock:
+            self.pending_evictions.discard(message_dict['id'])
+            self.pending_messages[message_dict['id']] = message_dict
+        self._ensure_flusher()
+
+    def mark_evicted(self, message_id: str) -> None:
+        """Queue a message to be flagged as evicted from memory on the next flush."""
+        with self.lock:
+            self.pending_evictions.add(message_id)
+        self._ensure_flusher()
+
+    def set_state(self, key: str, value) -> None:
+        """Queue a JSON-serializable state value to be written on the next flush."""
+        with self.lock:
+            self.pending_state[key] = json.dumps(value)
+        self._ensure_flusher()
+
+    def flush(self) -> int:
+        """
+        Write all pending changes in one transaction. Safe to call from any thread.
+
+        Returns:
+            int: Number of rows written or flagged
+        """
+        with self.lock:
+            messages, self.pending_messages = self.pending_messages, {}
+            evictions, self.pending_evictions = self.pending_evictions, set()
+            state, self.pending_state = self.pending_state, {}
+        if not messages and not evictions and not state:
+            return 0
+
+        now = time.time()
+        with self.db_lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO messages (id, data, updated_at) VALUES (?, ?, ?)",
+                [(message_id, json.dumps(data), now) for message_id, data in messages.items()]
+            )
+            # After the snapshots, so a message written and evicted in one batch ends up flagged
+            self.conn.executemany("UPDATE messages SET evicted = 1 WHERE id = ?", [(message_id,) for message_id in evictions])
+            self.conn.executemany("INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)", list(state.items()))
+        return len(messages) + len(evictions) + len(state)
+
+    def _ensure_flusher(self) -> None:
+        """Start the background flush task if an event loop is running."""
+        if self.flush_task is not None and not self.flush_task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # No loop (scripts, startup); changes wait for the next flush
+        self.flush_task = loop.create_task(self._flush_loop())
+
+    async def _flush_loop(self) -> None:
+        """Flush pending changes periodically in a worker thread."""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                logger.error(f"💥 Error flushing message store: {e}")
+
+    async def close(self) -> None:
+        """Stop the background flusher, write out pending changes and close the database."""
+        if self.flush_task is not None:
+            self.flush_task.cancel()
+            try:
+                await self.flush_task
+            except asyncio.CancelledError:
+                pass
+            self.flush_task = None
+        await asyncio.to_thread(self.flush)
+        with self.db_lock:
+            self.conn.close()
@@ -0,0 +1,80 @@
+import random
+import logging
+from typing import Dict
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class PollingScheduler:
+    """
+    Decides how long to wait between polling cycles.
+
+    Drops to the minimum interval as soon as a cycle sees new messages, then backs off
+    exponentially while the chat stays quiet or while polls keep failing, always within
+    the configured min/max bounds and with a little jitter so retries don't line up.
+    """
+
+    def __init__(self, config: Dict):
+        """
+        Initialize the scheduler.
+
+        Args:
+            config (Dict): Live config dict (shared with MessageManager), read on every call so
+                dashboard updates apply without a restart.
+        """
+        self.config = config
+        self.current_interval = None
+        self.consecutive_errors = 0
+
+    def _bounds(self):
+        """Get the (base, min, max) polling intervals from config."""
+        base = self.config.get("polling_interval_seconds", 120)
+        min_interval = self.config.get("min_polling_interval_seconds", base)
+        max_interval = self.config.get("max_polling_interval_seconds", base)
+        min_interval = min(min_interval, base)
+        max_interval = max(max_interval, base)
+        return base, min_interval, max_interval
+
+    def _jitter(self, delay: float) -> float:
+        """Spread a delay by +/- the configured jitter fraction."""
+        jitter = self.config.get("polling_jitter", 0.1)
+        return max(0.0, delay * random.uniform(1 - jitter, 1 + jitter))
+
+    def record_success(self, new_message_count: int) -> float:
+        """
+        Record a completed polling cycle and get the delay before the next one.
+
+        Args:
+            new_message_count (int): Number of new messages the cycle found
+
+        Returns:
+            float: Seconds to wait before polling again
+        """
+        base, min_interval, max_interval = self._bounds()
+        backoff_factor = self.config.get("polling_backoff_factor", 1.5)
+        self.consecutive_errors = 0
+
+        if new_message_count > 0:
+            # Chat is active, poll as fast as allowed
+            self.current_interval = min_interval
+        elif self.current_interval is None:
+            self.current_interval = base
+        else:
+            # Quiet cycle, back off towards the max interval
+            self.current_interval = min(max(self.current_interval, min_interval) * backoff_factor, max_interval)
+
+        return self._jitter(self.current_interval)
+
+    def record_error(self) -> float:
+        """
+        Record a failed polling cycle and get the delay before retrying.
+
+        Returns:
+            float: Seconds to wait before polling again
+        """
+        base, _, max_interval = self._bounds()
+        self.consecutive_errors += 1
+        # Cap the exponent so a long outage can't overflow the float multiply
+        delay = min(base * (2 ** min(self.consecutive_errors, 16)), max_interval)
+        # Full jitter on errors so a flapping API isn't hammered in lockstep
+        return random.uniform(base, max(base, delay))
@@ -0,0 +1,143 @@
+import time
+import random
+import logging
+from collections import deque
+from datetime import date, datetime
+from typing import Deque, Dict, List, Optional, Tuple
+from server.message_ids import new_message_id
+from server.message_manager import MessageManager, MessageObject
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class WarmPool:
+    """
+    Keeps ready-made random messages so a successful random roll is served instantly.
+
+    Holds up to warm_pool_size_per_type generated MessageObjects per message type. Refills are
+    meant to run when the generation queue is idle and stop once warm_pool_daily_token_budget
+    tokens have been spent today. Pooled messages older than warm_pool_max_age_seconds are
+    discarded rather than served.
+    """
+
+    def __init__(self, message_manager: MessageManager):
+        """
+        Initialize the warm pool.
+
+        Args:
+            message_manager (MessageManager): Supplies the config and message generator
+        """
+        self.message_manager = message_manager
+        self.config = message_manager.config
+        self.pool: Dict[str, Deque[Tuple[float, MessageObject]]] = {}
+        self.refilling: Dict[str, int] = {}
+        self.budget_day = date.today()
+        self.tokens_used_today = 0
+        self.served = 0
+        self.expired = 0
+
+    @property
+    def size_per_type(self) -> int:
+        return self.config.get("warm_pool_size_per_type", 0)
+
+    @property
+    def max_age(self) -> float:
+        return self.config.get("warm_pool_max_age_seconds", 21600)
+
+    @property
+    def daily_token_budget(self) -> int:
+        return self.config.get("warm_pool_daily_token_budget", 200000)
+
+    def _message_types(self) -> List[str]:
+        return self.message_manager.message_generator.get_message_types() or ["random thought"]
+
+    def _expire(self) -> None:
+        """Drop pooled messages older than the max age."""
+        cutoff = time.monotonic() - self.max_age
+        for entries in self.pool.values():
+            while entries and entries[0][0] < cutoff:
+                entries.popleft()
+                self.expired += 1
+
+    def _budget_remaining(self) -> int:
+        """Get the tokens left in today's refill budget."""
+        if date.today() != self.budget_day:
+            self.budget_day = date.today()
+            self.tokens_used_today = 0
+        return self.daily_token_budget - self.tokens_used_today
+
+    def take(self) -> Optional[MessageObject]:
+        """
+        Take a ready random message from the pool.
+
+        Returns:
+            MessageObject: A generated random message, or None if the pool is empty
+        """
+        self._expire()
+        ready = [message_type for message_type, entries in self.pool.items() if entries]
+        if not ready:
+            return None
+        _, message_obj = self.pool[random.choice(ready)].popleft()
+        # Serve it as a message created now: the id encodes its creation time too
+        message_obj.id = new_message_id()
+        message_obj.timestamp = datetime.now()
+        self.served += 1
+        return message_obj
+
+    def next_refill_type(self) -> Optional[str]:
+        """
+        Pick the message type most in need of a refill.
+
+        Returns:
+            str: Message type to generate next, or None if the pool is full, disabled or out of budget
+        """
+        if self.size_per_type <= 0 or self._budget_remaining() <= 0:
+            return None
+        self._expire()
+        shortfalls = []
+        for message_type in self._message_types():
+            have = len(self.pool.get(message_type, ())) + self.refilling.get(message_type, 0)
+            if have < self.size_per_type:
+                shortfalls.append((have, message_type))
+        if not shortfalls:
+            return None
+        return min(shortfalls)[1]
+
+    async def refill(self, message_type: str) -> Optional[MessageObject]:
+        """
+        Generate one random message of the given type and add it to the pool.
+
+        Returns:
+            MessageObject: The pooled message, or None if generation failed
+        """
+        self.refilling[message_type] = self.refilling.get(message_type, 0) + 1
+        usage = {'tokens': 0}
+        try:
+            message_obj = MessageObject("random")
+            candidates = await self.message_manager.message_generator.generate_messages(
+                self.config["message_generation_tries"], message_type, usage=usage
+            )
+            for candidate in candidates:
+                message_obj.add_generated_message(candidate)
+            self.pool.setdefault(message_type, deque()).append((time.monotonic(), message_obj))
+            logger.info(f"🔥 Warm pool refilled for message type '{message_type[:40]}...' ({usage['tokens']} tokens)")
+            return message_obj
+        except Exception as e:
+            logger.warning(f"⚠️ Warm pool refill failed: {e}")
+            return None
+        finally:
+            self.tokens_used_today += usage['tokens']
+            self.refilling[message_type] -= 1
+
+    def get_stats(self) -> Dict:
+        """Get pool size and counters."""
+        self._expire()
+        return {
+            'ready': sum(len(entries) for entries in self.pool.values()),
+            'target': self.size_per_type * len(self._message_types()),
+            'refilling': sum(self.refilling.values()),
+            'served': self.served,
+            'expired': self.expired,
+            'tokens_used_today': self.tokens_used_today,
+            'daily_token_budget': self.daily_token_budget,
+        }